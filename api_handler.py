@@ -1,18 +1,87 @@
 import os
 import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from abc import ABC, abstractmethod
+from decimal import Decimal
 from dotenv import load_dotenv
 import google.generativeai as genai
+import ijson
+from deadline import DeadlineExceeded
+from results import AIResult
+
+# Upper bound for a provider call when the caller passes a deadline
+DEFAULT_TIMEOUT = 60
 
 # Load environment variables
 load_dotenv()
 
+# Error bodies are only kept for the message
+MAX_ERROR_CHARS = 500
+
+# Where the response text sits in each API's JSON body
+CHAT_CONTENT = "choices.item.message.content"
+ANTHROPIC_CONTENT = "content.item.text"
+
+
+def read_json_fields(response, paths):
+    """
+    Pull a few fields out of a JSON response without keeping the whole body
+
+    Args:
+        response: a requests response made with stream=True
+        paths: ijson-style paths, e.g. "choices.item.message.content"
+               ("item" is an array element; the first match wins)
+
+    The body is parsed incrementally off the socket with ijson and only
+    the wanted values are kept; the full body is never held in memory.
+    The response is always closed.
+
+    Returns:
+        dict: path -> value for the paths that were found
+    """
+    wanted = set(paths)
+    found = {}
+    try:
+        # Let urllib3 undo any gzip/deflate transfer encoding while we read
+        response.raw.decode_content = True
+        for prefix, event, value in ijson.parse(response.raw):
+            if prefix in wanted and prefix not in found and event in ('string', 'number', 'boolean', 'null'):
+                found[prefix] = float(value) if isinstance(value, Decimal) else value
+    finally:
+        response.close()
+    return found
+
+
+def _error_text(response):
+    """Status body for an error message, truncated"""
+    try:
+        return response.text[:MAX_ERROR_CHARS]
+    finally:
+        response.close()
+
+
+def _is_timeout(error):
+    """Provider errors are wrapped in plain Exceptions, so match timeouts by type or message"""
+    return isinstance(error, (requests.Timeout, TimeoutError, FutureTimeoutError)) or \
+        'timed out' in str(error).lower()
+
+
+def _content(response, path, provider):
+    """The response text at `path`, decoded without keeping the rest of the body"""
+    text = read_json_fields(response, [path]).get(path)
+    if text is None:
+        raise Exception(f"{provider} API Error: response has no {path}")
+    return text
+
 class BaseAIProvider(ABC):
     """Abstract base class for all AI providers"""
     
     @abstractmethod
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+        """timeout: seconds for this call, None = the provider's default"""
         pass
     
     @abstractmethod
@@ -29,7 +98,7 @@ class DeepSeekProvider(BaseAIProvider):
         if not self.api_key:
             raise ValueError("❌ DEEPSEEK_API_KEY not found in .env file")
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -50,13 +119,14 @@ class DeepSeekProvider(BaseAIProvider):
             self.base_url,
             headers=headers,
             json=data,
-            timeout=45
+            timeout=timeout or 45,
+            stream=True
         )
         
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            return _content(response, CHAT_CONTENT, "DeepSeek")
         else:
-            raise Exception(f"DeepSeek API Error {response.status_code}: {response.text}")
+            raise Exception(f"DeepSeek API Error {response.status_code}: {_error_text(response)}")
     
     def get_provider_name(self):
         return "DeepSeek"
@@ -70,7 +140,7 @@ class OpenAIProvider(BaseAIProvider):
         if not self.api_key:
             raise ValueError("❌ OPENAI_API_KEY not found in .env file")
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -90,26 +160,150 @@ class OpenAIProvider(BaseAIProvider):
             self.base_url,
             headers=headers,
             json=data,
-            timeout=45
+            timeout=timeout or 45,
+            stream=True
         )
         
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            return _content(response, CHAT_CONTENT, "OpenAI")
         else:
-            raise Exception(f"OpenAI API Error {response.status_code}: {response.text}")
+            raise Exception(f"OpenAI API Error {response.status_code}: {_error_text(response)}")
     
     def get_provider_name(self):
         return "OpenAI GPT"
 
 
 class OllamaProvider(BaseAIProvider):
-    """Ollama Local API implementation"""
+    """Ollama Local API implementation
+
+    Throughput settings (all optional, read from .env):
+        OLLAMA_KEEP_ALIVE   - how long Ollama keeps the model loaded ("30m", -1 = forever)
+        OLLAMA_PRELOAD      - "true" loads the model into memory at startup
+        OLLAMA_NUM_PARALLEL - max requests in flight (match the server's OLLAMA_NUM_PARALLEL)
+        OLLAMA_NUM_CTX      - context window passed as options.num_ctx
+        OLLAMA_OPTIONS      - extra model options as JSON, e.g. {"num_thread": 8}
+        OLLAMA_TIMEOUT      - request timeout in seconds (default 60)
+
+    Every instance pointing at the same server (main, triage and ensemble
+    providers) shares one set of slots and one connection pool, and the
+    model is preloaded once per server.
+    """
+    
+    # base_url -> {"slots", "session", "preloaded"}
+    _servers = {}
+    _servers_lock = threading.Lock()
     
     def __init__(self):
         self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434/api/chat')
         self.model = os.getenv('OLLAMA_MODEL', 'codellama')
+        self.keep_alive = self._parse_keep_alive(os.getenv('OLLAMA_KEEP_ALIVE'))
+        self.num_parallel = max(1, int(os.getenv('OLLAMA_NUM_PARALLEL', '1')))
+        self.timeout = float(os.getenv('OLLAMA_TIMEOUT', '60'))
+        self.options = self._load_options()
+        
+        self._local = threading.local()
+        server = self._server()
+        self._slots = server["slots"]
+        self._session = server["session"]
+        
+        if os.getenv('OLLAMA_PRELOAD', 'false').lower() == 'true':
+            with self._servers_lock:
+                models = server["preloaded"]
+                first = self.model not in models
+                models.add(self.model)
+            if first and not self.preload():
+                with self._servers_lock:
+                    models.discard(self.model)
+    
+    def _server(self):
+        """Slots and connection pool shared by every instance for this server"""
+        with self._servers_lock:
+            server = self._servers.get(self.base_url)
+            if server is None:
+                # One pooled connection per parallel slot, the semaphore caps in-flight requests
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.num_parallel)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                server = {
+                    "slots": threading.BoundedSemaphore(self.num_parallel),
+                    "session": session,
+                    "preloaded": set()
+                }
+                self._servers[self.base_url] = server
+            return server
+    
+    @staticmethod
+    def _parse_keep_alive(value):
+        """Ollama wants a number of seconds or a duration string like '10m'"""
+        if value is None or value == '':
+            return None
+        if value.lstrip('-').isdigit():
+            return int(value)
+        return value
+    
+    def _load_options(self):
+        """Model options shared by every request"""
+        options = {}
+        extra = os.getenv('OLLAMA_OPTIONS')
+        if extra:
+            try:
+                options.update(json.loads(extra))
+            except ValueError as e:
+                raise ValueError(f"❌ OLLAMA_OPTIONS is not valid JSON: {e}")
+        num_ctx = os.getenv('OLLAMA_NUM_CTX')
+        if num_ctx:
+            options['num_ctx'] = int(num_ctx)
+        return options
+    
+    def preload(self):
+        """Load the model into memory so the first review doesn't pay the cold start"""
+        data = {"model": self.model, "messages": []}
+        if self.keep_alive is not None:
+            data["keep_alive"] = self.keep_alive
+        if self.options:
+            data["options"] = dict(self.options)
+        try:
+            response = self._session.post(self.base_url, json=data, timeout=self.timeout, stream=True)
+            if response.status_code == 200:
+                self._local.timings = self._extract_timings(read_json_fields(response, self.TIMING_FIELDS))
+                print(f"🔥 Ollama model {self.model} loaded "
+                      f"({self._local.timings['load_ms']:.0f} ms)")
+                return True
+            print(f"⚠️  Ollama preload failed {response.status_code}: {_error_text(response)}")
+        except requests.RequestException as e:
+            print(f"⚠️  Ollama preload failed: {e}")
+        return False
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    # Top-level counters in Ollama's response, all in nanoseconds except the counts
+    TIMING_FIELDS = ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration",
+                     "prompt_eval_count", "eval_count")
+    
+    @staticmethod
+    def _extract_timings(body):
+        """Convert Ollama's nanosecond counters into milliseconds and tokens/sec"""
+        ns = 1_000_000
+        eval_count = body.get("eval_count", 0)
+        eval_ns = body.get("eval_duration", 0)
+        return {
+            "load_ms": body.get("load_duration", 0) / ns,
+            "prompt_eval_ms": body.get("prompt_eval_duration", 0) / ns,
+            "eval_ms": eval_ns / ns,
+            "total_ms": body.get("total_duration", 0) / ns,
+            "prompt_tokens": body.get("prompt_eval_count", 0),
+            "eval_tokens": eval_count,
+            "tokens_per_sec": eval_count / (eval_ns / 1e9) if eval_ns else 0.0
+        }
+    
+    @property
+    def last_timings(self):
+        """Timings of the last request made from the current thread"""
+        return getattr(self._local, 'timings', None)
+    
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+        options = dict(self.options)
+        options["temperature"] = temperature
+        options["num_predict"] = max_tokens
         data = {
             "model": self.model,
             "messages": [
@@ -117,22 +311,34 @@ class OllamaProvider(BaseAIProvider):
                 {"role": "user", "content": prompt}
             ],
             "stream": False,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens
-            }
+            "options": options
         }
+        if self.keep_alive is not None:
+            data["keep_alive"] = self.keep_alive
         
-        response = requests.post(
-            self.base_url,
-            json=data,
-            timeout=60
-        )
+        # The wait for a slot counts against the timeout, so a deadline also bounds the queueing
+        timeout = timeout or self.timeout
+        start_time = time.time()
+        if not self._slots.acquire(timeout=timeout):
+            raise Exception(f"Ollama API Error: timed out after {timeout:.1f}s waiting for a free slot")
+        try:
+            response = self._session.post(
+                self.base_url,
+                json=data,
+                timeout=max(timeout - (time.time() - start_time), 0.1),
+                stream=True
+            )
+            if response.status_code != 200:
+                raise Exception(f"Ollama API Error {response.status_code}: {_error_text(response)}")
+            # Read inside the slot: the body is still on the pooled connection
+            fields = read_json_fields(response, self.TIMING_FIELDS + ("message.content",))
+        finally:
+            self._slots.release()
         
-        if response.status_code == 200:
-            return response.json()["message"]["content"]
-        else:
-            raise Exception(f"Ollama API Error {response.status_code}: {response.text}")
+        self._local.timings = self._extract_timings(fields)
+        if fields.get("message.content") is None:
+            raise Exception("Ollama API Error: response has no message.content")
+        return fields["message.content"]
     
     def get_provider_name(self):
         return f"Ollama ({self.model})"
@@ -147,7 +353,7 @@ class AnthropicProvider(BaseAIProvider):
         if not self.api_key:
             raise ValueError("❌ ANTHROPIC_API_KEY not found in .env file")
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
         headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json",
@@ -168,13 +374,14 @@ class AnthropicProvider(BaseAIProvider):
             self.base_url,
             headers=headers,
             json=data,
-            timeout=45
+            timeout=timeout or 45,
+            stream=True
         )
         
         if response.status_code == 200:
-            return response.json()["content"][0]["text"]
+            return _content(response, ANTHROPIC_CONTENT, "Anthropic")
         else:
-            raise Exception(f"Anthropic API Error {response.status_code}: {response.text}")
+            raise Exception(f"Anthropic API Error {response.status_code}: {_error_text(response)}")
     
     def get_provider_name(self):
         return "Anthropic Claude"
@@ -190,7 +397,7 @@ class GrokProvider(BaseAIProvider):
         if not self.api_key:
             raise ValueError("❌ GROK_API_KEY not found in .env file")
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -211,13 +418,14 @@ class GrokProvider(BaseAIProvider):
             self.base_url,
             headers=headers,
             json=data,
-            timeout=45
+            timeout=timeout or 45,
+            stream=True
         )
         
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            return _content(response, CHAT_CONTENT, "Grok")
         else:
-            raise Exception(f"Grok API Error {response.status_code}: {response.text}")
+            raise Exception(f"Grok API Error {response.status_code}: {_error_text(response)}")
     
     def get_provider_name(self):
         return "Grok (xAI)"
@@ -240,6 +448,7 @@ class GeminiProvider(BaseAIProvider):
             # Auto-detect available model
             self.model_name = self._find_working_model()
             self.model = genai.GenerativeModel(self.model_name)
+            self._executor = ThreadPoolExecutor(max_workers=int(os.getenv('GEMINI_MAX_WORKERS', '8')))
             print(f"✅ Using model: {self.model_name}")
             
         except Exception as e:
@@ -282,19 +491,27 @@ class GeminiProvider(BaseAIProvider):
             # Fallback to gemini-pro
             return 'gemini-pro'
     
-    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
         try:
             # Combine system message and prompt
             full_prompt = f"{system_message}\n\n{prompt}"
+            generation_config = genai.types.GenerationConfig(
+                max_output_tokens=max_tokens,
+                temperature=temperature,
+                top_p=0.8
+            )
             
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=max_tokens,
-                    temperature=temperature,
-                    top_p=0.8
+            if timeout is None:
+                response = self.model.generate_content(full_prompt, generation_config=generation_config)
+            else:
+                # The SDK call has no timeout of its own, so wait on it from a worker thread
+                future = self._executor.submit(
+                    self.model.generate_content, full_prompt, generation_config=generation_config
                 )
-            )
+                try:
+                    response = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    raise Exception(f"Request timed out after {timeout:.1f}s")
             
             if not response.parts:
                 if response.prompt_feedback.block_reason:
@@ -316,8 +533,14 @@ class AIProviderFactory:
     
     @staticmethod
     def create_provider(provider_name):
-        provider_name = provider_name.lower()
+        # Imported here: cassette.py builds on BaseAIProvider from this module
+        from cassette import wrap_provider
         
+        provider_name = provider_name.lower()
+        return wrap_provider(provider_name, lambda: AIProviderFactory._create(provider_name))
+    
+    @staticmethod
+    def _create(provider_name):
         if provider_name == "openai":
             return OpenAIProvider()
         elif provider_name == "ollama":
@@ -340,34 +563,73 @@ class UniversalAIHandler:
     Only change the provider in .env file to switch models
     """
     
-    def __init__(self):
+    def __init__(self, provider_name=None):
         # Get provider from environment variable (default: openai)
-        self.provider_name = os.getenv('AI_PROVIDER', 'openai').lower()
+        self.provider_name = (provider_name or os.getenv('AI_PROVIDER', 'openai')).lower()
         self.provider = AIProviderFactory.create_provider(self.provider_name)
         print(f"✅ Initialized {self.provider.get_provider_name()}")
     
-    def get_response(self, prompt, system_message, max_tokens=2000, temperature=0.3):
+    def get_result(self, prompt, system_message, max_tokens=2000, temperature=0.3, deadline=None):
         """
-        Universal method to get response from any provider
+        Universal method to call any provider, keeping failures out of the text
         
         Args:
             prompt (str): User prompt
             system_message (str): System instructions
             max_tokens (int): Maximum response length
             temperature (float): Creativity level (0-1)
+            deadline (Deadline): Optional budget; shrinks max_tokens and the timeout
         
         Returns:
-            str: AI response
+            AIResult: the response text, or the provider error in .error
+        
+        Raises:
+            DeadlineExceeded: if the budget is used up before the call, or the
+                              call outlives the deadline or hits a timeout
+                              the deadline had shortened
         """
+        provider_name = self.provider.get_provider_name()
+        timeout = None
+        capped = False
+        if deadline is not None:
+            deadline.check(f"calling {provider_name}")
+            prompt_tokens = (len(prompt) + len(system_message)) // 4
+            max_tokens = deadline.max_tokens(max_tokens, prompt_tokens)
+            timeout = deadline.timeout(DEFAULT_TIMEOUT)
+            capped = timeout < DEFAULT_TIMEOUT
+        
         try:
-            return self.provider.generate_response(
+            response = self.provider.generate_response(
                 prompt, 
                 system_message, 
                 max_tokens, 
-                temperature
+                temperature,
+                timeout
             )
+            if deadline is not None:
+                deadline.spend(prompt_tokens + len(response) // 4)
+            return AIResult(provider_name, text=response)
         except Exception as e:
-            return f"❌ Error from {self.provider.get_provider_name()}: {str(e)}"
+            if deadline is not None:
+                # The prompt was sent, so it counts against the budget either way
+                deadline.spend(prompt_tokens)
+                if deadline.expired() or (capped and _is_timeout(e)):
+                    # Out of time: let the caller return what it has. A timeout with
+                    # budget to spare is an ordinary provider error.
+                    raise DeadlineExceeded(f"Deadline expired while calling {provider_name}: {e}") from e
+            return AIResult(provider_name, error=str(e))
+    
+    def get_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, deadline=None):
+        """
+        Like get_result, but returns a plain string
+        
+        Returns:
+            str: AI response, or "❌ Error from <provider>: ..." if the call failed
+        """
+        result = self.get_result(prompt, system_message, max_tokens, temperature, deadline)
+        if result.ok:
+            return result.text
+        return f"❌ Error from {result.provider}: {result.error}"
 
 
 # Test the universal handler
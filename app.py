@@ -1,7 +1,14 @@
 from flask import Flask, request, jsonify, render_template
+import hmac
+import io
+import json
 import logging
 import os
 from dotenv import load_dotenv
+from tenants import Tenant, TenantRegistry, FairScheduler, TenantError, estimate_tokens
+from deadline import Deadline
+from review_store import parse_time
+from findings import SEVERITY_LEVELS
 
 # Load environment variables
 load_dotenv()
@@ -9,6 +16,12 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
+# Request size limits - JSON bodies are parsed in memory, uploads are
+# spooled to disk by Werkzeug and reviewed in chunks
+MAX_REVIEW_BYTES = int(os.getenv('MAX_REVIEW_BYTES', str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(8 * 1024 * 1024)))
+app.config['MAX_CONTENT_LENGTH'] = max(MAX_REVIEW_BYTES, MAX_UPLOAD_BYTES)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,46 +39,246 @@ except Exception as e:
     logger.error(f"❌ Failed to initialize CodeReviewer: {e}")
     provider_name = f"Error: {str(e)}"
 
+# API-key tenants and the weighted-fair scheduler in front of the AI provider
+tenant_registry = TenantRegistry()
+scheduler = FairScheduler()
+
+# Pull request webhooks run as their own CI-priority tenant unless mapped to a configured one
+pr_service = None
+if reviewer is not None:
+    from pr_review import PRReviewService
+    webhook_tenant = tenant_registry.tenants.get(os.getenv('WEBHOOK_API_KEY', '')) or tenant_registry.register(
+        Tenant('webhooks', priority='ci', max_concurrency=int(os.getenv('WEBHOOK_WORKERS', '4')), max_queued=1000)
+    )
+    pr_service = PRReviewService(reviewer, scheduler, webhook_tenant)
+
+def _parse_deadline(data):
+    """Caller's budget from the body/form or X-Deadline-Ms; raises ValueError if malformed"""
+    try:
+        return Deadline.from_request(data, request.headers)
+    except (TypeError, ValueError):
+        raise ValueError("deadline_ms and max_total_tokens must be numbers")
+
+def _is_admin(api_key):
+    """True only for ADMIN_API_KEY; with no admin key set nobody sees other tenants"""
+    admin_key = os.getenv('ADMIN_API_KEY')
+    return bool(admin_key and api_key) and hmac.compare_digest(api_key, admin_key)
+
+def _record_output(tenant, result, reserved=1000):
+    """Replace the reserved response budget with the actual response size"""
+    output_tokens = len(result.get('full_review') or '') // 4
+    scheduler.adjust(tenant, output_tokens - reserved)
+
 @app.route('/')
 def home():
     """Main page with code input form"""
-    return render_template('index.html', provider_name=provider_name)
+    speculative = reviewer is not None and reviewer.speculative is not None
+    return render_template('index.html', provider_name=provider_name, speculative=speculative)
+
+def _too_large(limit):
+    """Reject from the Content-Length header before reading the body"""
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({"error": f"Request too large. Limit is {limit} bytes"}), 413
+    return None
+
+def _read_json(limit):
+    """
+    Parse the JSON body, reading at most limit bytes
+
+    Content-Length is checked first, but a chunked body has none, so the
+    limit is also enforced while reading. Returns (data, error response).
+    """
+    rejected = _too_large(limit)
+    if rejected:
+        return None, rejected
+    body = bytearray()
+    while len(body) <= limit:
+        block = request.stream.read(min(64 * 1024, limit + 1 - len(body)))
+        if not block:
+            break
+        body += block
+    if len(body) > limit:
+        return None, (jsonify({"error": f"Request too large. Limit is {limit} bytes"}), 413)
+    try:
+        return json.loads(body), None
+    except ValueError:
+        return None, (jsonify({"error": "Invalid JSON"}), 400)
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Request too large. Limit is {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
 
 @app.route('/review', methods=['POST'])
 def review_code():
     """Handle code review requests"""
     try:
-        data = request.get_json()
+        tenant = tenant_registry.resolve(request.headers.get('X-API-Key'))
+        
+        # Unlike get_json() the body is capped per endpoint while it is read,
+        # and the raw bytes are not cached on the request while the review runs
+        data, rejected = _read_json(MAX_REVIEW_BYTES)
+        if rejected:
+            return rejected
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
+        if not isinstance(data, dict):
+            return jsonify({"error": "JSON body must be an object"}), 400
         
-        code = data.get('code', '').strip()
+        code = data.get('code', '')
         language = data.get('language', '')
         focus_areas = data.get('focus_areas', [])
+        mode = data.get('mode', 'single')
+        repo = data.get('repo', '')
+        file = data.get('file', '')
+        if not all(isinstance(value, str) for value in (code, language, mode, repo, file)):
+            return jsonify({"error": "code, language, mode, repo and file must be strings"}), 400
+        if not isinstance(focus_areas, list):
+            return jsonify({"error": "focus_areas must be a list"}), 400
+        try:
+            deadline = _parse_deadline(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        logger.info(f"📥 Received review request - Language: {language}, Code length: {len(code)}")
+        logger.info(f"📥 Received review request - Tenant: {tenant.name}, Language: {language}, Code length: {len(code)}")
         
-        if not code:
+        # isspace() instead of strip() avoids copying the whole submission
+        if not code or code.isspace():
             return jsonify({"error": "No code provided"}), 400
         
         if reviewer is None:
             return jsonify({"error": "Code review service unavailable. Check your API configuration."}), 500
         
-        # Perform code review
-        result = reviewer.review_code(code, focus_areas, language)
+        # Perform code review once the scheduler gives this tenant a slot
+        with scheduler.slot(tenant, estimate_tokens(len(code)), timeout=deadline.remaining() if deadline else None):
+            if mode == 'ensemble':
+                result = reviewer.review_code_ensemble(code, focus_areas, language, deadline, repo, file, tenant.name)
+            elif len(code) > reviewer.max_chunk_chars:
+                result = reviewer.review_stream(io.StringIO(code), focus_areas, language, deadline, repo, file, tenant.name)
+            else:
+                result = reviewer.review_code(code, focus_areas, language, deadline, repo, file, tenant.name)
+        _record_output(tenant, result)
+        if deadline:
+            result.budget = deadline.to_dict()
         
         logger.info(f"✅ Review completed - Rating: {result.get('rating', 'N/A')}/10")
         
         return jsonify({
             "success": True,
-            "review": result
+            "review": result.to_dict()
         })
         
+    except TenantError as e:
+        logger.warning(f"🚦 Review rejected: {e}")
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
         logger.error(f"💥 Review error: {e}")
         return jsonify({"error": f"Review failed: {str(e)}"}), 500
 
+@app.route('/review/draft', methods=['POST'])
+def review_draft():
+    """Speculative pre-review of a draft while the user is still typing"""
+    try:
+        tenant = tenant_registry.resolve(request.headers.get('X-API-Key'))
+        
+        if reviewer is None or reviewer.speculative is None:
+            return jsonify({"status": "disabled"})
+        
+        data, rejected = _read_json(MAX_REVIEW_BYTES)
+        if rejected:
+            return rejected
+        if not isinstance(data, dict):
+            return jsonify({"error": "JSON body must be an object"}), 400
+        
+        code = data.get('code', '')
+        language = data.get('language', '')
+        if not isinstance(code, str) or not isinstance(language, str):
+            return jsonify({"error": "code and language must be strings"}), 400
+        session_id = str(data.get('session_id') or request.remote_addr)
+        
+        admit = None
+        if reviewer.triage_handler is not None:
+            # Background triage-model calls take scheduler slots and count against the quota
+            def admit(size):
+                return scheduler.slot(tenant, estimate_tokens(size, max_tokens=300))
+        
+        status = reviewer.speculative.submit_draft(session_id, code, language, scope=tenant.name, admit=admit)
+        return jsonify({"status": status})
+        
+    except TenantError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        logger.error(f"💥 Draft error: {e}")
+        return jsonify({"error": f"Draft failed: {str(e)}"}), 500
+
+@app.route('/webhooks/pr', methods=['POST'])
+def pull_request_webhook():
+    """Git-host pull request events (HMAC-signed); the review runs in the background"""
+    if pr_service is None:
+        return jsonify({"error": "Code review service unavailable. Check your API configuration."}), 500
+    
+    rejected = _too_large(MAX_UPLOAD_BYTES)
+    if rejected:
+        return rejected
+    
+    # Raw bytes: the signature covers the body exactly as sent
+    response, status = pr_service.handle(request.get_data(), request.headers)
+    logger.info(f"🔀 Webhook {request.headers.get('X-GitHub-Delivery', '-')}: {response}")
+    return jsonify(response), status
+
+@app.route('/review/upload', methods=['POST'])
+def review_upload():
+    """Handle multipart file uploads, reviewed chunk by chunk"""
+    try:
+        tenant = tenant_registry.resolve(request.headers.get('X-API-Key'))
+        
+        rejected = _too_large(MAX_UPLOAD_BYTES)
+        if rejected:
+            return rejected
+        
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({"error": "No file provided"}), 400
+        
+        if reviewer is None:
+            return jsonify({"error": "Code review service unavailable. Check your API configuration."}), 500
+        
+        language = request.form.get('language', '')
+        focus_areas = request.form.getlist('focus_areas')
+        try:
+            deadline = _parse_deadline(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        logger.info(f"📥 Received upload - Tenant: {tenant.name}, File: {upload.filename}, Language: {language}")
+        
+        # Lines are decoded lazily from the spooled upload into the chunker
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8', errors='replace')
+        with scheduler.slot(tenant, estimate_tokens(request.content_length or 0),
+                            timeout=deadline.remaining() if deadline else None):
+            result = reviewer.review_stream(lines, focus_areas, language, deadline,
+                                            request.form.get('repo', ''),
+                                            request.form.get('file', upload.filename or ''), tenant.name)
+        _record_output(tenant, result)
+        if deadline:
+            result.budget = deadline.to_dict()
+        
+        if result.get('error') == "No code provided":
+            return jsonify({"error": "No code provided"}), 400
+        
+        logger.info(f"✅ Upload review completed - {result.get('summary', 'N/A')}")
+        
+        return jsonify({
+            "success": True,
+            "review": result.to_dict()
+        })
+        
+    except TenantError as e:
+        logger.warning(f"🚦 Upload rejected: {e}")
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        logger.error(f"💥 Upload review error: {e}")
+        return jsonify({"error": f"Review failed: {str(e)}"}), 500
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -83,6 +296,101 @@ def health_check():
             "error": provider_name
         }), 500
 
+def _history():
+    """
+    Review store and the tenant whose history the caller may see
+
+    Returns:
+        tuple: (store, tenant name or None for all tenants, error response or None)
+    """
+    if reviewer is None or reviewer.store is None:
+        return None, None, (jsonify({"error": "Review history is not enabled"}), 503)
+    api_key = request.headers.get('X-API-Key')
+    if _is_admin(api_key):
+        # Admins see every tenant, or one with ?tenant=
+        return reviewer.store, request.args.get('tenant'), None
+    try:
+        tenant = tenant_registry.resolve(api_key)
+    except TenantError as e:
+        return None, None, (jsonify({"error": str(e)}), e.status)
+    return reviewer.store, tenant.name, None
+
+@app.route('/reviews')
+def list_reviews():
+    """Paginated review history: ?repo=&file=&severity=&since=&until=&limit=&cursor="""
+    store, tenant, error = _history()
+    if error:
+        return error
+    
+    severity = request.args.get('severity')
+    if severity is not None and severity not in SEVERITY_LEVELS:
+        return jsonify({"error": f"severity must be one of {', '.join(SEVERITY_LEVELS)}"}), 400
+    try:
+        page = store.query(
+            repo=request.args.get('repo'),
+            file=request.args.get('file'),
+            severity=severity,
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 50),
+            tenant=tenant
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    return jsonify(page)
+
+@app.route('/reviews/<int:review_id>')
+def get_review(review_id):
+    """A stored review with its full text and findings"""
+    store, tenant, error = _history()
+    if error:
+        return error
+    review = store.get(review_id, tenant=tenant)
+    if review is None:
+        return jsonify({"error": "Review not found"}), 404
+    return jsonify(review)
+
+@app.route('/reviews/stats')
+def review_stats():
+    """Trend aggregates: ?group_by=day|tenant|repo|provider|language&repo=&since=&until="""
+    store, tenant, error = _history()
+    if error:
+        return error
+    try:
+        stats = store.stats(
+            group_by=request.args.get('group_by', 'day'),
+            repo=request.args.get('repo'),
+            since=parse_time(request.args.get('since')),
+            until=parse_time(request.args.get('until')),
+            tenant=tenant
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    return jsonify({"stats": stats})
+
+@app.route('/tenants/usage')
+def tenant_usage():
+    """Per-tenant usage metrics (all tenants with ADMIN_API_KEY, otherwise the caller's own)"""
+    api_key = request.headers.get('X-API-Key')
+    usage = scheduler.usage(tenant_registry)
+    
+    if not _is_admin(api_key):
+        try:
+            tenant = tenant_registry.resolve(api_key)
+        except TenantError as e:
+            return jsonify({"error": str(e)}), e.status
+        usage["tenants"] = [entry for entry in usage["tenants"] if entry["tenant"] == tenant.name]
+    
+    return jsonify(usage)
+
+@app.route('/review/draft/stats')
+def review_draft_stats():
+    """Hit rate of speculative pre-reviews"""
+    if reviewer is None or reviewer.speculative is None:
+        return jsonify({"status": "disabled"})
+    return jsonify(reviewer.speculative.stats)
+
 @app.route('/providers')
 def get_providers():
     """Return available AI providers"""
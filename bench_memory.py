@@ -0,0 +1,203 @@
+"""
+Memory benchmark for /review and /review/upload
+
+Each request size runs in a fresh subprocess so peak RSS is not polluted
+by earlier runs. The AI provider is replaced by a local echo provider,
+so this measures the server's own handling of the payload only.
+
+The in-flight run holds N reviews inside the provider call at once (the
+Ollama provider with its HTTP session swapped for a local one, so response
+decoding is included) and reports bytes per in-flight review and per
+finished result.
+
+Usage:
+    python bench_memory.py              # full table
+    python bench_memory.py json 512     # single run: path, size in KB
+    python bench_memory.py inflight 500 # single run: concurrent reviews
+"""
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import tracemalloc
+
+SIZES_KB = [1, 64, 512, 1024, 4096]
+PATHS = ['json', 'upload']
+INFLIGHT_COUNTS = [50, 200, 1000]
+
+# What a typical review looks like coming back from the model
+SAMPLE_REVIEW = (
+    "## BUGS & LOGICAL ERRORS\n" + "".join(f"- Line {n}: loop variable shadows the outer `total`\n" for n in range(1, 6))
+    + "## SECURITY ISSUES\n- Line 3: user input reaches eval()\n"
+    + "## CODE QUALITY\n" + "- Function names are not descriptive enough for the handler\n" * 5
+)
+
+
+def make_code(size_kb):
+    block = "def handler_{0}(items):\n    total = 0\n    for item in items:\n        total += item\n    return total\n\n"
+    parts = []
+    size = 0
+    i = 0
+    while size < size_kb * 1024:
+        part = block.format(i)
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return ''.join(parts)
+
+
+def run_one(path, size_kb):
+    # Ollama needs no API key, and the echo provider replaces it below
+    os.environ['AI_PROVIDER'] = 'ollama'
+    os.environ['OLLAMA_PRELOAD'] = 'false'
+
+    from werkzeug.test import EnvironBuilder
+    from api_handler import BaseAIProvider
+    import app as app_module
+
+    class EchoProvider(BaseAIProvider):
+        def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+            return "## BUGS & LOGICAL ERRORS\n- No issues found in this chunk"
+
+        def get_provider_name(self):
+            return "Echo (benchmark)"
+
+    reviewer = app_module.reviewer
+    if reviewer is None:
+        raise SystemExit(f"❌ CodeReviewer failed to start: {app_module.provider_name}")
+    reviewer.ai_handler.provider = EchoProvider()
+
+    # Build the WSGI environ up front so the client doesn't count towards the request
+    code = make_code(size_kb)
+    if path == 'json':
+        builder = EnvironBuilder(path='/review', method='POST', data=json.dumps({"code": code}),
+                                 content_type='application/json')
+    else:
+        builder = EnvironBuilder(path='/review/upload', method='POST',
+                                 data={"file": (io.BytesIO(code.encode()), "bench.py")})
+    environ = builder.get_environ()
+    del code
+
+    client = app_module.app.test_client()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    response = client.open(environ)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "path": path,
+        "size_kb": size_kb,
+        "status": response.status_code,
+        "heap_peak_kb": heap_peak // 1024,
+        "rss_peak_kb": rss_after,
+        "rss_growth_kb": rss_after - rss_before
+    }))
+
+
+def run_inflight(count):
+    os.environ['AI_PROVIDER'] = 'ollama'
+    os.environ['OLLAMA_PRELOAD'] = 'false'
+    os.environ['OLLAMA_NUM_PARALLEL'] = str(count)
+    os.environ['REVIEW_STORE'] = 'off'
+
+    import requests
+    from code_reviewer import CodeReviewer
+
+    body = json.dumps({
+        "model": "codellama",
+        "created_at": "2024-01-01T00:00:00Z",
+        "message": {"role": "assistant", "content": SAMPLE_REVIEW},
+        "done": True,
+        "total_duration": 5_000_000_000, "load_duration": 1_000_000, "prompt_eval_count": 120,
+        "prompt_eval_duration": 300_000_000, "eval_count": 400, "eval_duration": 4_000_000_000
+    }).encode()
+    in_flight = threading.Barrier(count + 1)
+    release = threading.Event()
+
+    class EchoSession:
+        """Stands in for the HTTP session: every call waits until all reviews are in flight"""
+        def post(self, url, json=None, timeout=None, stream=False):
+            in_flight.wait()
+            release.wait()
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = io.BytesIO(body)
+            return response
+
+    reviewer = CodeReviewer()
+    reviewer.ai_handler.provider._session = EchoSession()
+    code = make_code(2)
+    results = [None] * count
+
+    def review(index):
+        results[index] = reviewer.review_code(code)
+
+    threads = [threading.Thread(target=review, args=(i,)) for i in range(count)]
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for thread in threads:
+        thread.start()
+    in_flight.wait()
+    holding, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    release.set()
+    for thread in threads:
+        thread.join()
+    done, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    errors = sum(1 for result in results if result.get('error'))
+    print(json.dumps({
+        "path": "inflight",
+        "count": count,
+        "errors": errors,
+        "inflight_bytes": (holding - baseline) // count,
+        "peak_bytes": (peak - baseline) // count,
+        "result_bytes": (done - baseline) // count
+    }))
+
+
+def run_all():
+    print(f"{'path':<8}{'size':>10}{'status':>8}{'heap peak':>12}{'RSS peak':>12}{'RSS growth':>12}")
+    for path in PATHS:
+        for size_kb in SIZES_KB:
+            output = subprocess.run(
+                [sys.executable, __file__, path, str(size_kb)],
+                capture_output=True, text=True
+            )
+            try:
+                row = json.loads(output.stdout.strip().splitlines()[-1])
+            except (ValueError, IndexError):
+                print(f"❌ {path} {size_kb} KB failed:\n{output.stderr[-500:]}")
+                continue
+            print(f"{row['path']:<8}{str(row['size_kb']) + ' KB':>10}{row['status']:>8}"
+                  f"{str(row['heap_peak_kb']) + ' KB':>12}{str(row['rss_peak_kb']) + ' KB':>12}"
+                  f"{str(row['rss_growth_kb']) + ' KB':>12}")
+
+    print(f"\n{'reviews':>8}{'errors':>8}{'in flight':>14}{'peak':>14}{'result':>14}  (bytes per review)")
+    for count in INFLIGHT_COUNTS:
+        output = subprocess.run(
+            [sys.executable, __file__, 'inflight', str(count)],
+            capture_output=True, text=True
+        )
+        try:
+            row = json.loads(output.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            print(f"❌ inflight {count} failed:\n{output.stderr[-500:]}")
+            continue
+        print(f"{row['count']:>8}{row['errors']:>8}{row['inflight_bytes']:>14}{row['peak_bytes']:>14}"
+              f"{row['result_bytes']:>14}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == 'inflight':
+        run_inflight(int(sys.argv[2]))
+    elif len(sys.argv) == 3:
+        run_one(sys.argv[1], int(sys.argv[2]))
+    else:
+        run_all()
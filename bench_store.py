@@ -0,0 +1,110 @@
+"""
+Query latency benchmark for the review history store
+
+    python bench_store.py            # 1,000,000 reviews in a temporary database
+    python bench_store.py 200000     # custom row count
+
+Rows are bulk-loaded with SQL (record() would take far longer at this size),
+spread over several tenants with a skewed share each, then every query
+shape served by /reviews and /reviews/stats is timed: unscoped (admin key)
+and scoped to one tenant (every other caller).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from review_store import ReviewStore
+
+REPOS = [f"org/service-{i}" for i in range(50)]
+PROVIDERS = ["OpenAI GPT", "DeepSeek", "Anthropic Claude", "Ollama (codellama)"]
+LANGUAGES = ["python", "javascript"]
+# A few large tenants and a long tail of small ones; each owns a few repos
+TENANTS = [f"tenant-{i}" for i in range(20)]
+TENANT_WEIGHTS = [1 / (i + 1) for i in range(len(TENANTS))]
+TENANT_REPOS = {tenant: REPOS[i::len(TENANTS)] for i, tenant in enumerate(TENANTS)}
+
+
+def seed(store, rows):
+    conn = store._connection()
+    now = time.time()
+    batch = []
+    tenants = random.choices(TENANTS, TENANT_WEIGHTS, k=rows)
+    with conn:
+        for i in range(rows):
+            created_at = now - random.random() * 90 * 86400
+            batch.append((
+                created_at, f"{random.getrandbits(128):032x}", tenants[i], random.choice(TENANT_REPOS[tenants[i]]),
+                f"src/module_{random.randrange(2000)}.py", random.choice(LANGUAGES),
+                random.choice(PROVIDERS), random.randrange(200, 20000), random.randrange(100, 4000),
+                random.randrange(50, 1000), random.randrange(5), random.randrange(10)
+            ))
+            if len(batch) == 50000:
+                _insert(conn, batch)
+                batch = []
+        if batch:
+            _insert(conn, batch)
+        conn.execute(
+            "INSERT INTO daily_stats (day, tenant, repo, provider, language, reviews, latency_ms_total, "
+            "tokens_total) SELECT date(created_at, 'unixepoch'), tenant, repo, provider, language, COUNT(*), "
+            "SUM(latency_ms), SUM(prompt_tokens + completion_tokens) FROM reviews GROUP BY 1, 2, 3, 4, 5"
+        )
+
+
+def _insert(conn, batch):
+    conn.executemany(
+        "INSERT INTO reviews (created_at, code_hash, tenant, repo, file, language, provider, latency_ms, "
+        "prompt_tokens, completion_tokens, max_severity, finding_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch
+    )
+
+
+def timed(label, fn, runs=20):
+    fn()  # warm the page cache
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    print(f"{label:<45}{(time.perf_counter() - start_time) * 1000 / runs:>10.2f} ms")
+
+
+def main(rows):
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReviewStore(os.path.join(directory, "bench.db"))
+        start_time = time.time()
+        seed(store, rows)
+        print(f"📦 Seeded {rows:,} reviews in {time.time() - start_time:.1f}s\n")
+
+        week_ago = time.time() - 7 * 86400
+        first_page = store.query(repo=REPOS[0], limit=50)
+        timed("page: repo", lambda: store.query(repo=REPOS[0], limit=50))
+        timed("page: repo, next cursor", lambda: store.query(repo=REPOS[0], cursor=first_page["next_cursor"]))
+        timed("page: repo + file", lambda: store.query(repo=REPOS[0], file="src/module_7.py"))
+        timed("page: severity >= critical", lambda: store.query(severity="critical"))
+        timed("page: last 7 days", lambda: store.query(since=week_ago))
+        timed("stats: by day", lambda: store.stats("day"))
+        timed("stats: by provider, last 7 days", lambda: store.stats("provider", since=week_ago))
+        timed("stats: one repo by language", lambda: store.stats("language", repo=REPOS[0]))
+
+        # What non-admin callers run: the largest tenant and one from the tail
+        for tenant in (TENANTS[0], TENANTS[-1]):
+            print(f"\n🔒 Scoped to {tenant}")
+            first_page = store.query(tenant=tenant, limit=50)
+            timed("page: tenant", lambda: store.query(tenant=tenant, limit=50))
+            timed("page: tenant, next cursor",
+                  lambda: store.query(tenant=tenant, cursor=first_page["next_cursor"]))
+            repo = TENANT_REPOS[tenant][0]
+            timed("page: tenant + repo", lambda: store.query(tenant=tenant, repo=repo, limit=50))
+            timed("page: tenant + another tenant's repo", lambda: store.query(tenant=tenant, repo=REPOS[-1]))
+            timed("page: tenant + repo + file",
+                  lambda: store.query(tenant=tenant, repo=repo, file="src/module_7.py"))
+            timed("page: tenant, severity >= critical", lambda: store.query(tenant=tenant, severity="critical"))
+            timed("page: tenant, last 7 days", lambda: store.query(tenant=tenant, since=week_ago))
+            timed("stats: tenant by day", lambda: store.stats("day", tenant=tenant))
+            timed("stats: tenant by provider, last 7 days",
+                  lambda: store.stats("provider", since=week_ago, tenant=tenant))
+            timed("stats: tenant, one repo by language",
+                  lambda: store.stats("language", repo=repo, tenant=tenant))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
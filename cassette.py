@@ -0,0 +1,189 @@
+"""
+Record/replay of provider traffic
+
+    AI_CASSETTE_MODE=record  - call the real provider and append every
+                               request/response pair to the cassette
+    AI_CASSETTE_MODE=replay  - serve responses from the cassette, no network
+    AI_CASSETTE              - cassette path (".gz" suffix = gzip compressed)
+    AI_REPLAY_LATENCY_SCALE  - 1.0 replays original timings, 0 = instant
+
+A cassette is JSON lines, one interaction per line:
+    {"key": ..., "provider": "openai", "name": "OpenAI GPT",
+     "chunks": [[seconds since request, text], ...], "error": null}
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from api_handler import BaseAIProvider
+
+
+def cassette_key(provider_id, prompt, system_message, temperature):
+    """
+    Stable hash of the request
+
+    max_tokens is left out: with a deadline it shrinks with the wall-clock
+    time left, which would make every budgeted run miss in replay.
+    """
+    payload = json.dumps([provider_id, system_message, prompt, temperature])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """Thread-safe reader/appender for one cassette file"""
+
+    _open_cassettes = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._served = {}
+        if os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def get(cls, path):
+        """Share one Cassette per file across all providers"""
+        with cls._registry_lock:
+            if path not in cls._open_cassettes:
+                cls._open_cassettes[path] = cls(path)
+            return cls._open_cassettes[path]
+
+    def _open(self, mode):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def _load(self):
+        with self._open('r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records.setdefault(record["key"], []).append(record)
+
+    def append(self, record):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._open('a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._records.setdefault(record["key"], []).append(record)
+
+    def next_record(self, key):
+        """Recorded interactions for a key are served in order, then cycled"""
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                return None
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return records[index % len(records)]
+
+    def provider_name(self, provider_id):
+        with self._lock:
+            for records in self._records.values():
+                if records[0]["provider"] == provider_id:
+                    return records[0]["name"]
+        return None
+
+
+class RecordingProvider(BaseAIProvider):
+    """Wraps a real provider and records every call into a cassette"""
+
+    def __init__(self, provider, provider_id, cassette):
+        self.provider = provider
+        self.provider_id = provider_id
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        # Provider-specific extras (last_timings, preload, ...) pass through
+        return getattr(self.provider, name)
+
+    def _record(self, key, chunks, error=None):
+        self.cassette.append({
+            "key": key,
+            "provider": self.provider_id,
+            "name": self.provider.get_provider_name(),
+            "chunks": chunks,
+            "error": error
+        })
+
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+        key = cassette_key(self.provider_id, prompt, system_message, temperature)
+        start_time = time.time()
+        try:
+            response = self.provider.generate_response(prompt, system_message, max_tokens, temperature, timeout)
+        except Exception as e:
+            self._record(key, [[round(time.time() - start_time, 3), ""]], error=str(e))
+            raise
+        self._record(key, [[round(time.time() - start_time, 3), response]])
+        return response
+
+    def get_provider_name(self):
+        return self.provider.get_provider_name()
+
+
+class ReplayProvider(BaseAIProvider):
+    """Serves recorded responses with their original (or scaled) latency"""
+
+    def __init__(self, provider_id, cassette, latency_scale=1.0):
+        self.provider_id = provider_id
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+        self.name = cassette.provider_name(provider_id) or f"{provider_id} (replay)"
+
+    def _lookup(self, prompt, system_message, temperature):
+        key = cassette_key(self.provider_id, prompt, system_message, temperature)
+        record = self.cassette.next_record(key)
+        if record is None:
+            raise Exception(f"Replay miss: no recorded {self.provider_id} response for this request "
+                            f"in {self.cassette.path}")
+        return record
+
+    def generate_stream(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+        record = self._lookup(prompt, system_message, temperature)
+        start_time = time.time()
+        for offset, text in record["chunks"]:
+            delay = offset * self.latency_scale - (time.time() - start_time)
+            if timeout is not None and offset * self.latency_scale > timeout:
+                # Behave like a live provider that misses the caller's timeout
+                time.sleep(max(timeout - (time.time() - start_time), 0))
+                raise Exception(f"Request timed out after {timeout:.1f}s")
+            if delay > 0:
+                time.sleep(delay)
+            if text:
+                yield text
+        if record.get("error"):
+            raise Exception(record["error"])
+
+    def generate_response(self, prompt, system_message, max_tokens=2000, temperature=0.3, timeout=None):
+        return ''.join(self.generate_stream(prompt, system_message, max_tokens, temperature, timeout))
+
+    def get_provider_name(self):
+        return self.name
+
+
+def wrap_provider(provider_id, create):
+    """
+    Apply AI_CASSETTE_MODE to a provider
+
+    Args:
+        provider_id (str): factory name, e.g. "openai"
+        create (callable): builds the real provider (not called in replay mode)
+    """
+    mode = os.getenv('AI_CASSETTE_MODE', '').lower()
+    if not mode:
+        return create()
+
+    cassette = Cassette.get(os.getenv('AI_CASSETTE', 'cassettes/providers.jsonl.gz'))
+    if mode == 'record':
+        return RecordingProvider(create(), provider_id, cassette)
+    if mode == 'replay':
+        return ReplayProvider(provider_id, cassette, float(os.getenv('AI_REPLAY_LATENCY_SCALE', '1.0')))
+    raise ValueError(f"Unsupported AI_CASSETTE_MODE: {mode}")
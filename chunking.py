@@ -0,0 +1,53 @@
+import re
+
+# Lines where it's safe to cut: top-level definitions in common languages
+BOUNDARY_RE = re.compile(r'^(def |class |async def |function |export |public |private |func |fn |@|#|//)')
+
+
+def _pieces(lines, max_chars):
+    """Lines cut to at most max_chars each; file-like sources are read piece by piece"""
+    if hasattr(lines, 'readline'):
+        # readline(limit) stops mid-line, so a minified file is never read in one go
+        yield from iter(lambda: lines.readline(max_chars), '')
+        return
+    for line in lines:
+        for i in range(0, len(line), max_chars):
+            yield line[i:i + max_chars]
+
+
+def iter_chunks(lines, max_chars=12000):
+    """
+    Group an iterable of lines into review-sized chunks
+
+    Lines are consumed lazily, so a file-like object (an upload stream,
+    io.StringIO) is never fully loaded. Chunks are cut at a top-level
+    definition once they are three quarters full, and hard-cut at max_chars;
+    a single line longer than max_chars is split across chunks.
+
+    Yields:
+        tuple: (first line number, last line number, chunk text)
+    """
+    buffer = []
+    size = 0
+    start_line = 1
+    line_number = 0
+    at_line_start = True
+
+    for piece in _pieces(lines, max_chars):
+        if at_line_start:
+            line_number += 1
+        if buffer and (
+            size + len(piece) > max_chars
+            or (at_line_start and size >= max_chars * 3 // 4 and BOUNDARY_RE.match(piece))
+        ):
+            yield start_line, line_number - 1 if at_line_start else line_number, ''.join(buffer)
+            buffer = []
+            size = 0
+            start_line = line_number
+
+        buffer.append(piece)
+        size += len(piece)
+        at_line_start = piece.endswith('\n')
+
+    if buffer:
+        yield start_line, line_number, ''.join(buffer)
@@ -1,16 +1,70 @@
 import os
 import re
+import time
 from api_handler import UniversalAIHandler
+from chunking import iter_chunks
+from deadline import DeadlineExceeded
+from ensemble import EnsembleReviewer
+from results import ReviewResult
+from review_store import ReviewStore
+from speculative import SpeculativeReviewer
+from triage import (
+    static_risk, has_security_risk, should_escalate, create_triage_prompt, parse_risk,
+    SYSTEM_MESSAGE as TRIAGE_SYSTEM_MESSAGE
+)
 
 class CodeReviewer:
     def __init__(self):
         print("🚀 Initializing CodeReviewer...")
         self.ai_handler = UniversalAIHandler()
         self.system_message = "You are a code reviewer. Review code and provide feedback."
+        
+        # Two-tier cascade: triage every snippet cheaply, escalate risky ones
+        self.cascade_enabled = os.getenv('REVIEW_CASCADE', 'false').lower() == 'true'
+        self.triage_threshold = float(os.getenv('TRIAGE_THRESHOLD', '4'))
+        self.triage_handler = None
+        triage_provider = os.getenv('TRIAGE_PROVIDER', '')
+        if self.cascade_enabled and triage_provider:
+            try:
+                self.triage_handler = UniversalAIHandler(triage_provider)
+            except Exception as e:
+                print(f"⚠️  Triage provider '{triage_provider}' unavailable, using static pre-pass: {e}")
+        
+        # Optional multi-provider consensus mode (ENSEMBLE_PROVIDERS=openai,deepseek,...)
+        self.ensemble = None
+        if os.getenv('ENSEMBLE_PROVIDERS'):
+            try:
+                self.ensemble = EnsembleReviewer()
+            except Exception as e:
+                print(f"⚠️  Ensemble mode unavailable: {e}")
+        
+        # Large inputs are reviewed in chunks of this many characters
+        self.max_chunk_chars = int(os.getenv('MAX_CHUNK_CHARS', '12000'))
+        self.max_chunks = int(os.getenv('MAX_REVIEW_CHUNKS', '20'))
+        
+        # With less time than this left, use the fast tier instead of the premium model
+        self.fast_tier_seconds = float(os.getenv('DEADLINE_FAST_TIER_SECONDS', '10'))
+        
+        # Speculative triage of drafts from the web UI (needs the cascade)
+        self.speculative = None
+        if os.getenv('SPECULATIVE_REVIEW', 'false').lower() == 'true':
+            if self.cascade_enabled:
+                self.speculative = SpeculativeReviewer(self)
+            else:
+                print("⚠️  SPECULATIVE_REVIEW needs REVIEW_CASCADE=true, speculation disabled")
+        
+        # Review history (REVIEW_STORE=off disables it)
+        self.store = None
+        if os.getenv('REVIEW_STORE', 'on').lower() != 'off':
+            try:
+                self.store = ReviewStore()
+            except Exception as e:
+                print(f"⚠️  Review history unavailable: {e}")
         print("✅ CodeReviewer initialized!")
 
     def detect_language(self, code):
-        code_lower = code.lower()
+        # The first few KB are enough, and avoid lower-casing a huge input
+        code_lower = code[:4096].lower()
         if 'def ' in code_lower or 'import ' in code_lower:
             return 'python'
         elif 'function' in code_lower or 'const ' in code_lower:
@@ -19,35 +73,280 @@ class CodeReviewer:
             return 'python'
 
     def create_review_prompt(self, code, language, focus_areas=None):
-        prompt = f"Review this {language} code:\n```{language}\n{code}\n```\n"
-        prompt += "Provide feedback on bugs, security, performance, and code quality."
-        return prompt
+        # Single f-string so the code is copied into the prompt only once
+        return (
+            f"Review this {language} code:\n```{language}\n{code}\n```\n"
+            "Provide feedback on bugs, security, performance, and code quality."
+        )
 
-    def review_code(self, code, focus_areas=None, language=None):
+    def triage_code(self, code, language, deadline=None):
+        """
+        Fast tier: score the risk of a snippet with the static pre-pass and,
+        if configured, a small/local model
+
+        Returns:
+            dict: risk_score (0-10), security (a security pattern matched),
+                  notes, provider and the triage review text
+        """
+        static_score, static_notes = static_risk(code)
+        security = has_security_risk(static_notes)
+        
+        if self.triage_handler is None:
+            return {
+                "risk_score": static_score,
+                "security": security,
+                "notes": "\n".join(f"- {note}" for note in static_notes),
+                "provider": "Static pre-pass",
+                "review": None
+            }
+        
+        response = self.triage_handler.get_result(
+            prompt=create_triage_prompt(code, language, static_notes),
+            system_message=TRIAGE_SYSTEM_MESSAGE,
+            max_tokens=300,
+            temperature=0.1,
+            deadline=deadline
+        )
+        if response.ok:
+            model_score, notes = parse_risk(response.text)
+        else:
+            # Don't pass the provider error on as review notes
+            print(f"⚠️  Triage failed: {response.error}")
+            model_score, notes = None, "\n".join(f"- {note}" for note in static_notes)
+        if model_score is None:
+            # Unparseable or failed triage - escalate to be safe
+            model_score = 10
+        
+        return {
+            "risk_score": max(model_score, static_score),
+            "security": security,
+            "notes": notes,
+            "provider": self.triage_handler.provider.get_provider_name(),
+            "review": notes
+        }
+
+    def _triage_result(self, triage, language):
+        """Build the review result for snippets that stay on the fast tier"""
+        review = triage["review"]
+        if not review:
+            if triage["notes"]:
+                review = "Static triage notes:\n" + triage["notes"]
+            else:
+                review = "✅ Static triage found no risky patterns. No in-depth review needed."
+        return ReviewResult(
+            full_review=review,
+            summary="Low-risk snippet reviewed by the fast tier",
+            rating=7,
+            language=language,
+            provider=triage["provider"],
+            tier="triage",
+            risk_score=triage["risk_score"],
+            speculative=triage.get("speculative", False)
+        )
+
+    def review_code(self, code, focus_areas=None, language=None, deadline=None, repo='', file='', tenant=''):
+        """Review a snippet and record the result in the review history"""
+        start_time = time.time()
+        result = self._review_code(code, focus_areas, language, deadline, tenant)
+        self._record(code, result, start_time, repo, file, tenant)
+        return result
+
+    def _record(self, code, result, start_time, repo, file, tenant=''):
+        if self.store is None:
+            return
+        try:
+            result.review_id = self.store.record(
+                code, result, (time.time() - start_time) * 1000, repo=repo, file=file, tenant=tenant
+            )
+        except Exception as e:
+            print(f"⚠️  Could not save review history: {e}")
+
+    def _review_code(self, code, focus_areas=None, language=None, deadline=None, tenant=''):
         print("🔍 Starting code review...")
+        triage = None
         try:
             if not language:
                 language = self.detect_language(code)
             
+            handler = self.ai_handler
+            tier = None
+            if deadline and self.triage_handler and deadline.less_than(self.fast_tier_seconds):
+                # Tight budget: skip the triage stage and let the fast model do the review
+                handler = self.triage_handler
+                tier = "fast"
+            elif self.cascade_enabled:
+                if self.speculative is not None:
+                    triage = self.speculative.lookup(code, language, deadline, scope=tenant)
+                if triage is None:
+                    triage = self.triage_code(code, language, deadline)
+                if not should_escalate(triage, self.triage_threshold):
+                    return self._triage_result(triage, language)
+                if deadline:
+                    # Out of budget after triage: the triage is the best we can return
+                    deadline.check("escalating to the premium model")
+                tier = "premium"
+            
             prompt = self.create_review_prompt(code, language, focus_areas)
+            if triage and triage["notes"]:
+                prompt += f"\n\nTriage notes from a first-pass reviewer:\n{triage['notes']}"
             
-            response = self.ai_handler.get_response(
+            response = handler.get_result(
                 prompt=prompt,
                 system_message=self.system_message,
-                max_tokens=1000
+                max_tokens=1000,
+                deadline=deadline
             )
+            if not response.ok:
+                error = f"Error from {response.provider}: {response.error}"
+                if triage is None:
+                    raise Exception(error)
+                # Premium tier failed: the triage is better than nothing
+                print(f"⚠️  {error} - returning the fast-tier triage")
+                result = self._triage_result(triage, language)
+                result.summary = "Premium review failed - returning the fast-tier triage only"
+                result.error = error
+                result.partial = True
+                return result
             
-            return {
-                "full_review": response,
-                "summary": "Review completed successfully",
-                "rating": 7,
-                "language": language,
-                "provider": self.ai_handler.provider.get_provider_name()
-            }
+            result = ReviewResult(
+                full_review=response.text,
+                summary="Review completed successfully",
+                rating=7,
+                language=language,
+                provider=response.provider
+            )
+            if tier:
+                result.tier = tier
+            if triage:
+                result.risk_score = triage["risk_score"]
+                result.speculative = triage.get("speculative", False)
+            
+            # Local providers report load vs eval time (e.g. Ollama)
+            timings = getattr(handler.provider, 'last_timings', None)
+            if timings:
+                result.timings = timings
+            
+            return result
             
+        except DeadlineExceeded as e:
+            print(f"⏱️  Deadline reached in review_code: {e}")
+            if triage:
+                result = self._triage_result(triage, language)
+                result.summary = "Deadline reached - returning the fast-tier triage only"
+            else:
+                result = ReviewResult(error=str(e))
+            result.partial = True
+            return result
         except Exception as e:
             print(f"❌ Error in review_code: {e}")
-            return {"error": str(e)}
+            return ReviewResult(error=str(e))
+
+    def review_stream(self, lines, focus_areas=None, language=None, deadline=None, repo='', file='', tenant=''):
+        """
+        Review a large input chunk by chunk
+
+        Args:
+            lines: any iterable of lines (upload stream, io.StringIO, list)
+
+        Only one chunk of source is held in memory at a time; each chunk goes
+        through review_code, so the triage pre-pass applies per chunk.
+        When the deadline expires the chunks reviewed so far are returned.
+        """
+        print("🔍 Starting chunked code review...")
+        chunks = []
+        reviews = []
+        truncated = False
+        
+        for start, end, chunk in iter_chunks(lines, self.max_chunk_chars):
+            if len(chunks) >= self.max_chunks or (deadline and deadline.expired()):
+                truncated = True
+                break
+            if not language:
+                language = self.detect_language(chunk)
+            
+            result = self.review_code(chunk, focus_areas, language, deadline, repo=repo, file=file, tenant=tenant)
+            chunks.append({
+                "lines": [start, end],
+                "review_id": result.get("review_id"),
+                "tier": result.get("tier"),
+                "risk_score": result.get("risk_score"),
+                "error": result.get("error"),
+                "partial": bool(result.get("partial"))
+            })
+            reviews.append(f"## Lines {start}-{end}\n\n{result.get('full_review') or result.get('error')}")
+        
+        if not chunks:
+            return ReviewResult(error="No code provided")
+        # A chunk that fell back to its triage has an error but still a review
+        if all(chunk["error"] and not chunk["partial"] for chunk in chunks):
+            return ReviewResult(error=chunks[0]["error"], chunks=chunks)
+        
+        summary = f"Reviewed {len(chunks)} chunk(s)"
+        if truncated:
+            if deadline and deadline.expired():
+                summary += " (deadline reached)"
+            else:
+                summary += f" (stopped at MAX_REVIEW_CHUNKS={self.max_chunks})"
+        return ReviewResult(
+            full_review="\n\n".join(reviews),
+            summary=summary,
+            rating=7,
+            language=language,
+            provider=self.ai_handler.provider.get_provider_name(),
+            chunks=chunks,
+            truncated=truncated,
+            partial=truncated or any(chunk["error"] or chunk["partial"] for chunk in chunks)
+        )
+
+    def review_code_ensemble(self, code, focus_areas=None, language=None, deadline=None, repo='', file='', tenant=''):
+        """Review with every ensemble provider in parallel and merge their findings"""
+        print("🔍 Starting ensemble code review...")
+        start_time = time.time()
+        try:
+            if self.ensemble is None:
+                raise ValueError("Ensemble mode is not configured. Set ENSEMBLE_PROVIDERS in .env file")
+            if not language:
+                language = self.detect_language(code)
+            
+            prompt = self.create_review_prompt(code, language, focus_areas)
+            prompt_tokens = (len(prompt) + len(self.system_message)) // 4
+            max_tokens = 1000
+            if deadline:
+                deadline.check("calling the ensemble")
+                # Every provider gets the prompt, so the budget is split between them
+                max_tokens = deadline.max_tokens(max_tokens, prompt_tokens, calls=len(self.ensemble.providers))
+            ensemble = self.ensemble.review(
+                prompt, self.system_message,
+                max_tokens=max_tokens,
+                deadline=deadline.remaining() if deadline else None
+            )
+            if deadline:
+                deadline.spend(prompt_tokens * len(self.ensemble.providers) +
+                               sum(len(review) // 4 for review in ensemble["responses"].values()))
+            
+            result = ReviewResult(
+                full_review="\n\n".join(
+                    f"## {name}\n\n{review}" for name, review in ensemble["responses"].items()
+                ),
+                summary=f"Consensus of {len(ensemble['responses'])}/{len(self.ensemble.providers)} providers",
+                rating=7,
+                language=language,
+                provider=", ".join(ensemble["responses"]) or "None (deadline expired)",
+                findings=ensemble["findings"],
+                latencies=ensemble["latencies"],
+                errors=ensemble["errors"],
+                timed_out=ensemble["timed_out"],
+                partial=bool(ensemble["timed_out"])
+            )
+            self._record(code, result, start_time, repo, file, tenant)
+            return result
+            
+        except DeadlineExceeded as e:
+            print(f"⏱️  Deadline reached in review_code_ensemble: {e}")
+            return ReviewResult(error=str(e), partial=True)
+        except Exception as e:
+            print(f"❌ Error in review_code_ensemble: {e}")
+            return ReviewResult(error=str(e))
 
 def test_simple():
     print("🧪 SIMPLE TEST STARTING...")
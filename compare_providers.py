@@ -1,6 +1,8 @@
 from api_handler import AIProviderFactory
+from ensemble import EnsembleReviewer
 import time
 import os
+import sys
 
 def compare_providers():
     """Compare response quality and speed between providers"""
@@ -40,5 +42,45 @@ def find_duplicates(items):
         except Exception as e:
             print(f"❌ {provider_name} failed: {e}")
 
+def compare_ensemble(providers_to_test=None, deadline=30):
+    """Send the same code to all providers in parallel and show merged findings"""
+    
+    test_code = """
+def find_duplicates(items):
+    duplicates = []
+    for i in range(len(items)):
+        for j in range(i+1, len(items)):
+            if items[i] == items[j]:
+                duplicates.append(items[i])
+    return duplicates
+"""
+    
+    system_message = "You are an expert code reviewer. Provide structured feedback."
+    prompt = f"Review this Python code for efficiency and suggest improvements:\n```python\n{test_code}\n```"
+    
+    if providers_to_test is None:
+        providers_to_test = ['deepseek', 'openai']
+    
+    ensemble = EnsembleReviewer(providers_to_test, deadline=deadline)
+    result = ensemble.review(prompt, system_message, max_tokens=800)
+    
+    print(f"\n{'='*50}")
+    print(f"Ensemble of {len(ensemble.providers)} providers ({result['elapsed']:.2f}s, deadline {deadline}s)")
+    print(f"{'='*50}")
+    for name, latency in result["latencies"].items():
+        print(f"✅ {name}: {latency:.2f} seconds")
+    for name, error in result["errors"].items():
+        print(f"❌ {name} failed: {error}")
+    for name in result["timed_out"]:
+        print(f"⏱️  {name} missed the deadline")
+    
+    print(f"\n🔎 {len(result['findings'])} merged findings:")
+    for finding in result["findings"]:
+        location = f"line {finding['line']}" if finding["line"] else (finding["symbol"] or "-")
+        print(f"[{finding['agreement']:.0%}] {finding['category']:<15} {location:<12} {finding['message'][:100]}")
+
 if __name__ == "__main__":
-    compare_providers()
\ No newline at end of file
+    if "--ensemble" in sys.argv:
+        compare_ensemble()
+    else:
+        compare_providers()
\ No newline at end of file
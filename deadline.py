@@ -0,0 +1,106 @@
+import os
+import time
+
+# Smallest response worth asking a provider for
+MIN_RESPONSE_TOKENS = 64
+
+
+class DeadlineExceeded(Exception):
+    """The caller's time or token budget ran out"""
+    pass
+
+
+class Deadline:
+    """
+    Latency and cost budget for one review, passed from /review down to the providers
+
+    Args:
+        seconds (float): wall-clock budget, None = no time limit
+        token_budget (int): total tokens (prompt + response) allowed, None = unlimited
+    """
+
+    def __init__(self, seconds=None, token_budget=None):
+        self.expires_at = time.time() + seconds if seconds is not None else None
+        self.token_budget = token_budget
+        self.tokens_spent = 0
+        # Rough generation speed, used to size max_tokens to the time left
+        self.tokens_per_sec = float(os.getenv('DEADLINE_TOKENS_PER_SEC', '40'))
+
+    @classmethod
+    def from_request(cls, data, headers):
+        """
+        Build from the request: {"deadline_ms": 8000, "max_total_tokens": 4000}
+        or the X-Deadline-Ms header. Returns None if the caller set no budget.
+        """
+        deadline_ms = data.get('deadline_ms') or headers.get('X-Deadline-Ms')
+        token_budget = data.get('max_total_tokens')
+        if not deadline_ms and not token_budget:
+            return None
+        return cls(
+            seconds=float(deadline_ms) / 1000 if deadline_ms else None,
+            token_budget=int(token_budget) if token_budget else None
+        )
+
+    def remaining(self):
+        """Seconds left, or None if there is no time limit"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.time(), 0.0)
+
+    def tokens_left(self):
+        if self.token_budget is None:
+            return None
+        return max(self.token_budget - self.tokens_spent, 0)
+
+    def expired(self):
+        return self.remaining() == 0.0 or self.tokens_left() == 0
+
+    def less_than(self, seconds):
+        remaining = self.remaining()
+        return remaining is not None and remaining < seconds
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline expired before {stage}")
+
+    def timeout(self, default):
+        """Provider timeout: the provider's default, capped by the time left"""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, max(remaining, 0.1))
+
+    def max_tokens(self, requested, prompt_tokens=0, calls=1):
+        """
+        Shrink max_tokens so the response fits the time and token budget
+
+        Args:
+            calls (int): parallel calls sharing the budget, each sending the prompt
+
+        Raises:
+            DeadlineExceeded: if the token budget can't pay for the prompt
+                              plus a minimal response
+        """
+        allowed = requested
+        remaining = self.remaining()
+        if remaining is not None:
+            allowed = min(allowed, int(remaining * self.tokens_per_sec))
+        tokens_left = self.tokens_left()
+        if tokens_left is not None:
+            per_call = tokens_left // calls - prompt_tokens
+            if per_call < MIN_RESPONSE_TOKENS:
+                raise DeadlineExceeded(
+                    f"Token budget exhausted: {tokens_left} tokens left for {calls} call(s) "
+                    f"with {prompt_tokens} prompt tokens each"
+                )
+            allowed = min(allowed, per_call)
+        return max(allowed, MIN_RESPONSE_TOKENS)
+
+    def spend(self, tokens):
+        self.tokens_spent += tokens
+
+    def to_dict(self):
+        remaining = self.remaining()
+        return {
+            "remaining_ms": round(remaining * 1000) if remaining is not None else None,
+            "tokens_spent": self.tokens_spent,
+            "token_budget": self.token_budget
+        }
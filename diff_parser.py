@@ -0,0 +1,70 @@
+import re
+
+HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$')
+
+
+def parse_diff(diff_text):
+    """
+    Split a unified diff into files and hunks
+
+    Returns:
+        list: one dict per changed file:
+              {"path", "hunks": [{"header", "lines": [(new line number, text, added)]}]}
+              Deleted files and binary files are skipped.
+    """
+    files = []
+    current = None
+    hunk = None
+    new_line = 0
+    previous = ''
+
+    for line in diff_text.splitlines():
+        is_new_file = line.startswith('+++ ') and previous.startswith('--- ')
+        previous = line
+
+        if line.startswith('diff --git '):
+            current = None
+            hunk = None
+            continue
+        if is_new_file:
+            path = line[4:].strip()
+            hunk = None
+            if path == '/dev/null':
+                current = None
+                continue
+            if path.startswith('b/'):
+                path = path[2:]
+            current = {"path": path, "hunks": []}
+            files.append(current)
+            continue
+        if current is None:
+            continue
+
+        match = HUNK_RE.match(line)
+        if match:
+            new_line = int(match.group(3))
+            hunk = {"header": line, "lines": []}
+            current["hunks"].append(hunk)
+            continue
+        if hunk is None:
+            continue
+
+        if line.startswith('+'):
+            hunk["lines"].append((new_line, line[1:], True))
+            new_line += 1
+        elif line.startswith(' ') or line == '':
+            hunk["lines"].append((new_line, line[1:], False))
+            new_line += 1
+        # '-' lines only exist on the old side, '\' is "No newline at end of file"
+
+    return [f for f in files if any(h["lines"] for h in f["hunks"])]
+
+
+def hunk_code(hunk):
+    """New-side source of a hunk, and the file line number of its first line"""
+    lines = hunk["lines"]
+    return '\n'.join(text for _, text, _ in lines), lines[0][0]
+
+
+def added_lines(hunk):
+    return {number for number, _, added in hunk["lines"] if added}
@@ -0,0 +1,73 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from api_handler import AIProviderFactory
+from findings import merge_findings
+
+
+class EnsembleReviewer:
+    """
+    Sends one prompt to several providers in parallel and merges their findings
+
+    Latency is bounded by the deadline: whatever responses arrived in time
+    are merged, slower providers are reported as timed out.
+    """
+
+    def __init__(self, provider_names=None, deadline=None):
+        if provider_names is None:
+            provider_names = [name.strip() for name in os.getenv('ENSEMBLE_PROVIDERS', '').split(',') if name.strip()]
+        self.deadline = deadline if deadline is not None else float(os.getenv('ENSEMBLE_DEADLINE', '30'))
+
+        self.providers = []
+        for name in provider_names:
+            try:
+                self.providers.append(AIProviderFactory.create_provider(name))
+            except Exception as e:
+                print(f"⚠️  Skipping {name} in ensemble: {e}")
+
+        if not self.providers:
+            raise ValueError("❌ No ensemble providers available. Set ENSEMBLE_PROVIDERS in .env file")
+
+    @staticmethod
+    def _call(provider, prompt, system_message, max_tokens, temperature, timeout):
+        start_time = time.time()
+        review = provider.generate_response(prompt, system_message, max_tokens, temperature, timeout)
+        return review, time.time() - start_time
+
+    def review(self, prompt, system_message, max_tokens=1000, temperature=0.3, deadline=None):
+        """
+        Fan the prompt out to every provider and wait at most `deadline` seconds
+
+        Returns:
+            dict: per-provider responses, merged findings, failures and timeouts
+        """
+        deadline = self.deadline if deadline is None else deadline
+        start_time = time.time()
+
+        # Not a context manager: leaving the `with` block would wait for the slowest vendor
+        executor = ThreadPoolExecutor(max_workers=len(self.providers))
+        futures = {
+            executor.submit(self._call, provider, prompt, system_message, max_tokens, temperature, deadline): provider
+            for provider in self.providers
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        responses = {}
+        latencies = {}
+        errors = {}
+        for future in done:
+            name = futures[future].get_provider_name()
+            try:
+                responses[name], latencies[name] = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+
+        return {
+            "responses": responses,
+            "latencies": {name: round(latency, 2) for name, latency in latencies.items()},
+            "findings": merge_findings(responses, queried=len(self.providers)),
+            "errors": errors,
+            "timed_out": sorted(futures[future].get_provider_name() for future in not_done),
+            "elapsed": round(time.time() - start_time, 2)
+        }
@@ -0,0 +1,112 @@
+"""
+Local stand-in for a git host, to exercise /webhooks/pr end to end
+
+    # 1. start the fake host (serves diffs, collects posted reviews)
+    python fake_git_host.py serve
+
+    # 2. run the reviewer against it
+    GIT_API_BASE=http://localhost:5050 WEBHOOK_SECRET=dev-secret python app.py
+
+    # 3. send a signed pull_request event (send twice to see idempotency)
+    python fake_git_host.py send
+    python fake_git_host.py send my_change.diff
+
+Posted reviews are printed and available at GET /reviews-posted.
+"""
+import hashlib
+import hmac
+import json
+import os
+import sys
+import uuid
+import requests
+from flask import Flask, request, jsonify
+
+SECRET = os.getenv('WEBHOOK_SECRET', 'dev-secret')
+HOST_PORT = int(os.getenv('FAKE_GIT_HOST_PORT', '5050'))
+REVIEWER_URL = os.getenv('REVIEWER_URL', 'http://localhost:5000')
+REPO = 'acme/widgets'
+NUMBER = 1
+
+SAMPLE_DIFF = """diff --git a/db.py b/db.py
+--- a/db.py
++++ b/db.py
+@@ -1,4 +1,7 @@
+ import sqlite3
+
+ def get_user(conn, username):
+-    return None
++    cursor = conn.cursor()
++    cursor.execute(f"SELECT * FROM users WHERE name = '{username}'")
++    return cursor.fetchone()
++
+diff --git a/utils.js b/utils.js
+--- a/utils.js
++++ b/utils.js
+@@ -0,0 +1,3 @@
++function calculate(expression) {
++    return eval(expression);
++}
+"""
+
+app = Flask(__name__)
+diffs = {}
+posted = []
+
+
+@app.route('/repos/<owner>/<name>/pulls/<int:number>')
+def get_pull(owner, name, number):
+    return diffs.get(f"{owner}/{name}#{number}", SAMPLE_DIFF), 200, {"Content-Type": "text/x-diff"}
+
+
+@app.route('/repos/<owner>/<name>/pulls/<int:number>/reviews', methods=['POST'])
+def post_review(owner, name, number):
+    review = request.get_json()
+    posted.append(review)
+    print(f"\n📬 Review for {owner}/{name}#{number} ({len(review['comments'])} comments)")
+    print(review["body"])
+    for comment in review["comments"]:
+        print(f"  {comment['path']}:{comment['line']}  {comment['body'][:100]}")
+    return jsonify({"id": len(posted)}), 201
+
+
+@app.route('/reviews-posted')
+def reviews_posted():
+    return jsonify(posted)
+
+
+def send_event(diff_path=None, delivery=None):
+    """Post a signed pull_request event to the reviewer"""
+    head_sha = hashlib.sha1((open(diff_path).read() if diff_path else SAMPLE_DIFF).encode()).hexdigest()
+    payload = {
+        "action": "synchronize",
+        "repository": {"full_name": REPO},
+        "pull_request": {"number": NUMBER, "head": {"sha": head_sha}}
+    }
+    if diff_path:
+        # Inline diff, so the host doesn't need to know about it
+        with open(diff_path) as f:
+            payload["diff"] = f.read()
+
+    body = json.dumps(payload).encode('utf-8')
+    signature = 'sha256=' + hmac.new(SECRET.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    response = requests.post(
+        f"{REVIEWER_URL}/webhooks/pr",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": "pull_request",
+            "X-GitHub-Delivery": delivery or str(uuid.uuid4()),
+            "X-Hub-Signature-256": signature
+        },
+        timeout=10
+    )
+    print(f"{response.status_code}: {response.text}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'send':
+        send_event(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        print(f"🧪 Fake git host on http://localhost:{HOST_PORT}")
+        app.run(host='0.0.0.0', port=HOST_PORT)
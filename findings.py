@@ -0,0 +1,173 @@
+import re
+from results import Finding
+
+# Section headings in a review mapped to a finding category
+CATEGORY_KEYWORDS = [
+    ('security', ('security', 'vulnerab', 'injection')),
+    ('bug', ('bug', 'error', 'logic')),
+    ('performance', ('performance', 'efficien', 'complexity')),
+    ('maintainability', ('maintainab', 'documentation', 'error handling')),
+    ('quality', ('quality', 'readab', 'style', 'naming', 'best practice')),
+    ('suggestion', ('suggest', 'improvement', 'recommend')),
+]
+
+# Severity levels, stored as their index (0 = info ... 4 = critical)
+SEVERITY_LEVELS = ('info', 'low', 'medium', 'high', 'critical')
+
+CATEGORY_SEVERITY = {
+    'security': 'high',
+    'bug': 'high',
+    'performance': 'medium',
+    'maintainability': 'low',
+    'quality': 'low',
+    'suggestion': 'info',
+    'general': 'low',
+}
+
+CRITICAL_RE = re.compile(r'\b(critical|injection|remote code|rce|arbitrary code|data loss)\b', re.IGNORECASE)
+
+# Sections that describe the code rather than list findings
+SKIP_SECTIONS = ('summary', 'overview', 'rating', 'conclusion')
+
+HEADING_RE = re.compile(r'^\s*(?:#{1,6}\s+(?P<title>.+)|(?:\d+[.)]\s+)?\*\*(?P<bold>[^*]+)\*\*)')
+BULLET_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+(.+)$')
+LINE_RE = re.compile(r'\blines?\s*[:#]?\s*(\d+)', re.IGNORECASE)
+SYMBOL_RE = re.compile(r'`([A-Za-z_][\w.]*)(?:\(\))?`')
+WORD_RE = re.compile(r'[a-z0-9_]{3,}')
+
+
+def _categorize(heading):
+    heading = heading.lower()
+    if any(word in heading for word in SKIP_SECTIONS):
+        return None
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in heading for keyword in keywords):
+            return category
+    return 'general'
+
+
+def _heading(line):
+    """
+    Returns (True, category) if the line starts a new section
+
+    Markdown headings always do; bold lead-ins like "2. **SECURITY ISSUES**"
+    only when they name a known section, so "- **Bug**: ..." stays a finding.
+    """
+    match = HEADING_RE.match(line)
+    if not match:
+        return False, None
+    if match.group('title'):
+        return True, _categorize(match.group('title'))
+    category = _categorize(match.group('bold'))
+    if category == 'general':
+        return False, None
+    return True, category
+
+
+def parse_findings(review_text):
+    """
+    Extract individual findings from a markdown review
+
+    Every bullet point under a findings section becomes one finding.
+
+    Returns:
+        list: Finding objects with category, severity, line (int or None), symbol and message
+    """
+    findings = []
+    category = 'general'
+
+    for raw_line in review_text.splitlines():
+        is_heading, heading_category = _heading(raw_line)
+        if is_heading:
+            category = heading_category
+            continue
+        if category is None:
+            continue
+
+        bullet = BULLET_RE.match(raw_line)
+        if not bullet:
+            continue
+        message = bullet.group(1).strip()
+        if len(message) < 8:
+            continue
+
+        line_match = LINE_RE.search(message)
+        symbol_match = SYMBOL_RE.search(message)
+        severity = CATEGORY_SEVERITY[category]
+        if category in ('security', 'bug') and CRITICAL_RE.search(message):
+            severity = 'critical'
+        findings.append(Finding(
+            category=category,
+            severity=severity,
+            line=int(line_match.group(1)) if line_match else None,
+            symbol=symbol_match.group(1) if symbol_match else None,
+            message=message
+        ))
+
+    return findings
+
+
+def severity_rank(severity):
+    """'high' -> 3; unknown names rank as info"""
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else 0
+
+
+def _similar(a, b, threshold=0.5):
+    """Jaccard similarity of the words in two messages"""
+    words_a = set(WORD_RE.findall(a.lower()))
+    words_b = set(WORD_RE.findall(b.lower()))
+    if not words_a or not words_b:
+        return False
+    return len(words_a & words_b) / len(words_a | words_b) >= threshold
+
+
+def _same_location(finding, cluster):
+    if finding["category"] != cluster["category"]:
+        return False
+    if finding["line"] is not None and cluster["line"] is not None:
+        return abs(finding["line"] - cluster["line"]) <= 1
+    if finding["symbol"] and cluster["symbol"]:
+        return finding["symbol"] == cluster["symbol"]
+    return _similar(finding["message"], cluster["message"])
+
+
+def merge_findings(reviews, queried=None):
+    """
+    Deduplicate findings across several providers' reviews
+
+    Args:
+        reviews (dict): provider name -> review text
+        queried (int): providers asked, including ones that failed or timed
+                       out (default: the ones that answered)
+
+    Returns:
+        list: merged findings sorted by agreement, each with the providers
+              that reported it and an agreement score (0-1)
+    """
+    clusters = []
+
+    for provider, review_text in reviews.items():
+        for finding in parse_findings(review_text):
+            for cluster in clusters:
+                if _same_location(finding, cluster):
+                    cluster["providers"].add(provider)
+                    if cluster["line"] is None:
+                        cluster["line"] = finding["line"]
+                    if cluster["symbol"] is None:
+                        cluster["symbol"] = finding["symbol"]
+                    if severity_rank(finding["severity"]) > severity_rank(cluster["severity"]):
+                        cluster["severity"] = finding["severity"]
+                    break
+            else:
+                finding.providers = {provider}
+                clusters.append(finding)
+
+    total = queried or len(reviews) or 1
+    merged = []
+    for cluster in clusters:
+        cluster.providers = sorted(cluster.providers)
+        cluster.agreement = round(len(cluster.providers) / total, 2)
+        merged.append(cluster)
+
+    merged.sort(key=lambda f: (-f["agreement"], f["line"] if f["line"] is not None else 1 << 30))
+    return merged
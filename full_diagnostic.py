@@ -10,6 +10,7 @@ print("=" * 50)
 # Check environment variables
 print("📋 Environment Variables:")
 print(f"AI_PROVIDER: {os.getenv('AI_PROVIDER')}")
+print(f"AI_CASSETTE_MODE: {os.getenv('AI_CASSETTE_MODE') or 'live'}")
 print(f"OPENAI_API_KEY exists: {bool(os.getenv('OPENAI_API_KEY'))}")
 print(f"OPENAI_API_KEY starts with 'sk-': {os.getenv('OPENAI_API_KEY', '').startswith('sk-')}")
 print(f"OPENAI_API_KEY length: {len(os.getenv('OPENAI_API_KEY', ''))}")
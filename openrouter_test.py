@@ -1,3 +1,5 @@
+# Calls OpenRouter directly: there is no OpenRouter provider in AIProviderFactory,
+# so AI_CASSETTE_MODE record/replay does not apply to this script.
 import requests
 
 # Replace this with your actual API key
@@ -0,0 +1,228 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from diff_parser import parse_diff, hunk_code
+from findings import parse_findings
+from tenants import TenantError, estimate_tokens
+
+EXTENSION_LANGUAGES = {
+    '.py': 'python', '.js': 'javascript', '.jsx': 'javascript', '.ts': 'typescript',
+    '.tsx': 'typescript', '.java': 'java', '.cpp': 'cpp', '.cc': 'cpp', '.c': 'c', '.h': 'cpp',
+    '.php': 'php', '.go': 'go', '.rb': 'ruby', '.rs': 'rust', '.cs': 'csharp', '.kt': 'kotlin',
+}
+
+REVIEWED_ACTIONS = ('opened', 'synchronize', 'reopened')
+
+
+def verify_signature(secret, body, signature_header):
+    """Check a GitHub-style X-Hub-Signature-256 header (sha256=<hex HMAC of the raw body>)"""
+    if not signature_header or not signature_header.startswith('sha256='):
+        return False
+    expected = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header)
+
+
+class IdempotencyCache:
+    """Remembers processed delivery ids / PR revisions so redeliveries are dropped"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._seen = {}
+
+    def claim(self, keys):
+        """True if none of the keys was seen before (and marks them all as seen)"""
+        now = time.time()
+        with self._lock:
+            for key, seen_at in list(self._seen.items()):
+                if now - seen_at > self.ttl:
+                    del self._seen[key]
+            if any(key in self._seen for key in keys):
+                return False
+            for key in keys:
+                self._seen[key] = now
+            return True
+
+    def release(self, keys):
+        """Forget keys of a failed event so a redelivery is processed again"""
+        with self._lock:
+            for key in keys:
+                self._seen.pop(key, None)
+
+
+class PRReviewService:
+    """
+    Reviews pull requests from git-host webhooks
+
+    Settings (.env):
+        WEBHOOK_SECRET        - HMAC secret shared with the git host (required)
+        GIT_API_BASE          - API root, e.g. https://api.github.com or a local fake host
+        GIT_TOKEN             - token used to fetch diffs and post reviews
+        WEBHOOK_WORKERS       - files reviewed concurrently
+        WEBHOOK_COMMENT_BATCH - inline comments per posted review
+    """
+
+    def __init__(self, reviewer, scheduler, tenant):
+        self.reviewer = reviewer
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.secret = os.getenv('WEBHOOK_SECRET')
+        self.api_base = os.getenv('GIT_API_BASE', 'https://api.github.com').rstrip('/')
+        self.token = os.getenv('GIT_TOKEN')
+        self.batch_size = int(os.getenv('WEBHOOK_COMMENT_BATCH', '30'))
+        self.max_files = int(os.getenv('WEBHOOK_MAX_FILES', '50'))
+        self._files_pool = ThreadPoolExecutor(max_workers=int(os.getenv('WEBHOOK_WORKERS', '4')))
+        self._events_pool = ThreadPoolExecutor(max_workers=2)
+        self._seen = IdempotencyCache(float(os.getenv('WEBHOOK_IDEMPOTENCY_TTL', '86400')))
+        self._session = requests.Session()
+
+    def _headers(self, accept='application/vnd.github+json'):
+        headers = {"Accept": accept}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def handle(self, body, headers):
+        """
+        Validate a webhook delivery and queue the review
+
+        Args:
+            body (bytes): raw request body (the HMAC covers the exact bytes)
+            headers: request headers
+
+        Returns:
+            tuple: (response dict, HTTP status)
+        """
+        if not self.secret:
+            return {"error": "WEBHOOK_SECRET is not configured"}, 503
+        if not verify_signature(self.secret, body, headers.get('X-Hub-Signature-256')):
+            return {"error": "Invalid signature"}, 401
+
+        event = headers.get('X-GitHub-Event', 'pull_request')
+        if event == 'ping':
+            return {"status": "pong"}, 200
+        if event != 'pull_request':
+            return {"status": "ignored", "reason": f"event {event}"}, 202
+
+        try:
+            payload = json.loads(body)
+            action = payload.get('action')
+            pr = payload['pull_request']
+            repo = payload['repository']['full_name']
+            number = pr['number']
+            head_sha = pr['head']['sha']
+        except (ValueError, KeyError, TypeError) as e:
+            return {"error": f"Malformed pull_request event: {e}"}, 400
+
+        if action not in REVIEWED_ACTIONS:
+            return {"status": "ignored", "reason": f"action {action}"}, 202
+
+        # Same delivery redelivered, or another event for a revision already reviewed
+        keys = [f"pr:{repo}#{number}@{head_sha}"]
+        delivery = headers.get('X-GitHub-Delivery')
+        if delivery:
+            keys.append(f"delivery:{delivery}")
+        if not self._seen.claim(keys):
+            return {"status": "duplicate"}, 200
+
+        self._events_pool.submit(self._process, keys, repo, number, head_sha, payload.get('diff'))
+        return {"status": "accepted", "repo": repo, "pull_request": number, "head_sha": head_sha}, 202
+
+    def _process(self, keys, repo, number, head_sha, diff_text):
+        start_time = time.time()
+        posted = []
+        try:
+            if diff_text is None:
+                diff_text = self._fetch_diff(repo, number)
+            files = parse_diff(diff_text)[:self.max_files]
+            print(f"🔀 Reviewing {repo}#{number} ({len(files)} files)")
+
+            results = list(self._files_pool.map(lambda f: self._review_file(repo, f), files))
+            self._post_review(repo, number, head_sha, results, posted)
+            print(f"✅ Reviewed {repo}#{number} in {time.time() - start_time:.1f}s")
+        except Exception as e:
+            print(f"❌ PR review failed for {repo}#{number}: {e}")
+            if posted:
+                # A redelivery would post the earlier batches again as duplicate comments
+                print(f"⚠️  {len(posted)} comment batch(es) already posted, not retrying {repo}#{number}")
+            else:
+                self._seen.release(keys)
+
+    def _fetch_diff(self, repo, number):
+        response = self._session.get(
+            f"{self.api_base}/repos/{repo}/pulls/{number}",
+            headers=self._headers('application/vnd.github.v3.diff'),
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise Exception(f"Diff fetch failed {response.status_code}: {response.text[:200]}")
+        return response.text
+
+    def _review_file(self, repo, file_diff):
+        """Review each hunk of one file; returns inline comments and file-level notes"""
+        path = file_diff["path"]
+        language = EXTENSION_LANGUAGES.get(os.path.splitext(path)[1].lower())
+        comments = []
+        notes = []
+
+        for hunk in file_diff["hunks"]:
+            code, first_line = hunk_code(hunk)
+            if not code.strip():
+                continue
+            diff_lines = {number for number, _, _ in hunk["lines"]}
+
+            try:
+                with self.scheduler.slot(self.tenant, estimate_tokens(len(code))):
+                    result = self.reviewer.review_code(code, language=language, repo=repo, file=path,
+                                                       tenant=self.tenant.name)
+            except TenantError as e:
+                # Queue full/timeout or quota: skip this hunk, keep the reviews already paid for
+                notes.append(f"⚠️ Lines {first_line}+: review skipped ({e})")
+                continue
+
+            if result.get("error"):
+                notes.append(f"⚠️ Lines {first_line}+: review failed ({result['error']})")
+                if not result.get("full_review"):
+                    continue
+
+            for finding in result.get("findings") or parse_findings(result.get("full_review") or ''):
+                file_line = first_line + finding["line"] - 1 if finding["line"] else None
+                body = f"**{finding['category']}** ({finding['severity']}): {finding['message']}"
+                if file_line in diff_lines:
+                    comments.append({"path": path, "line": file_line, "side": "RIGHT", "body": body})
+                else:
+                    notes.append(body)
+
+        return {"path": path, "comments": comments, "notes": notes}
+
+    def _post_review(self, repo, number, head_sha, results, posted):
+        """Post the comments in batches; indexes of the posted batches are appended to `posted`"""
+        comments = [comment for result in results for comment in result["comments"]]
+        summary = [f"🤖 AI review: {len(results)} file(s), {len(comments)} inline comment(s)"]
+        for result in results:
+            if result["notes"]:
+                summary.append(f"\n**{result['path']}**")
+                summary.extend(f"- {note}" for note in result["notes"])
+        body = "\n".join(summary)
+
+        batches = [comments[i:i + self.batch_size] for i in range(0, len(comments), self.batch_size)] or [[]]
+        for index, batch in enumerate(batches):
+            response = self._session.post(
+                f"{self.api_base}/repos/{repo}/pulls/{number}/reviews",
+                headers=self._headers(),
+                json={
+                    "commit_id": head_sha,
+                    "event": "COMMENT",
+                    "body": body if index == 0 else f"(continued {index + 1}/{len(batches)})",
+                    "comments": batch
+                },
+                timeout=30
+            )
+            if response.status_code not in (200, 201):
+                raise Exception(f"Posting review failed {response.status_code}: {response.text[:200]}")
+            posted.append(index)
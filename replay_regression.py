@@ -0,0 +1,94 @@
+"""
+Offline throughput and correctness regression for CodeReviewer
+
+    python replay_regression.py record   # live providers: record cassette + golden results
+    python replay_regression.py          # replay: no network, compare against golden results
+
+Uses AI_CASSETTE (default cassettes/regression.jsonl.gz) and writes the
+golden results next to it. AI_REPLAY_LATENCY_SCALE controls replay speed
+(1.0 = recorded latency, 0 = as fast as possible).
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SNIPPETS = {
+    "trivial_getter": "def hello(): return 'world'",
+    "find_duplicates": """
+def find_duplicates(items):
+    duplicates = []
+    for i in range(len(items)):
+        for j in range(i+1, len(items)):
+            if items[i] == items[j]:
+                duplicates.append(items[i])
+    return duplicates
+""",
+    "sql_injection": """
+import sqlite3
+
+def get_user(conn, username):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM users WHERE name = '{username}'")
+    return cursor.fetchone()
+""",
+    "eval_calculator": """
+function calculate(expression) {
+    const password = "admin123";
+    return eval(expression);
+}
+""",
+}
+
+# Fields that must not change between the recording and a replay
+COMPARED_FIELDS = ("full_review", "language", "provider", "tier", "risk_score", "error")
+
+
+def main(mode):
+    os.environ['AI_CASSETTE_MODE'] = mode
+    os.environ.setdefault('AI_CASSETTE', 'cassettes/regression.jsonl.gz')
+    golden_path = os.path.splitext(os.environ['AI_CASSETTE'].replace('.gz', ''))[0] + '.golden.json'
+    concurrency = int(os.getenv('REGRESSION_CONCURRENCY', '4'))
+    repeat = int(os.getenv('REGRESSION_REPEAT', '1' if mode == 'record' else '5'))
+
+    from code_reviewer import CodeReviewer
+    reviewer = CodeReviewer()
+
+    jobs = [name for name in SNIPPETS for _ in range(repeat)]
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda name: (name, reviewer.review_code(SNIPPETS[name])), jobs))
+    elapsed = time.time() - start_time
+
+    print(f"\n⚡ {len(jobs)} reviews in {elapsed:.2f}s "
+          f"({len(jobs) / elapsed:.1f} reviews/sec, concurrency {concurrency})")
+
+    actual = {}
+    for name, result in results:
+        actual.setdefault(name, {field: result.get(field) for field in COMPARED_FIELDS})
+
+    if mode == 'record':
+        with open(golden_path, 'w') as f:
+            json.dump(actual, f, indent=2, sort_keys=True)
+        print(f"✅ Recorded {len(actual)} golden results to {golden_path}")
+        return 0
+
+    with open(golden_path) as f:
+        golden = json.load(f)
+
+    failures = 0
+    for name, expected in golden.items():
+        for field in COMPARED_FIELDS:
+            if actual.get(name, {}).get(field) != expected.get(field):
+                failures += 1
+                print(f"❌ {name}: '{field}' differs from the recording")
+    if failures:
+        print(f"❌ {failures} regression(s)")
+        return 1
+    print(f"✅ All {len(golden)} snippets match the recording")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main('record' if 'record' in sys.argv[1:] else 'replay'))
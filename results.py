@@ -0,0 +1,78 @@
+"""
+Compact result types for reviews, findings and provider calls
+
+These replace the per-review dicts: with __slots__ there is no per-object
+__dict__, which adds up with thousands of reviews in flight. Fields that
+were never set are left out of to_dict(), so the JSON responses keep the
+same shape as before. Item access (result["tier"], result.get("error"))
+is kept for the code that treated results as dicts.
+"""
+
+
+class _Record:
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, value):
+        try:
+            setattr(self, name, value)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __contains__(self, name):
+        return name in self.__slots__ and hasattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in self.__slots__ else default
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def to_dict(self):
+        data = {}
+        for name in self.keys():
+            value = getattr(self, name)
+            if isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, _Record) else item for item in value]
+            data[name] = value
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Finding(_Record):
+    """One issue from a review; providers/agreement are set when merging an ensemble"""
+    __slots__ = ('category', 'severity', 'line', 'symbol', 'message', 'providers', 'agreement')
+
+
+class ReviewResult(_Record):
+    """What review_code, review_stream and review_code_ensemble return"""
+    __slots__ = (
+        'full_review', 'summary', 'rating', 'language', 'provider', 'tier', 'risk_score',
+        'speculative', 'timings', 'findings', 'latencies', 'errors', 'timed_out', 'chunks',
+        'truncated', 'partial', 'error', 'review_id', 'budget'
+    )
+
+
+class AIResult:
+    """A provider call: the response text, or the error instead of it"""
+    __slots__ = ('text', 'error', 'provider')
+
+    def __init__(self, provider, text=None, error=None):
+        self.provider = provider
+        self.text = text
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
@@ -0,0 +1,296 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from findings import parse_findings, severity_rank, SEVERITY_LEVELS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    code_hash TEXT NOT NULL,
+    tenant TEXT NOT NULL DEFAULT '',
+    repo TEXT NOT NULL DEFAULT '',
+    file TEXT NOT NULL DEFAULT '',
+    language TEXT,
+    provider TEXT,
+    tier TEXT,
+    latency_ms INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    max_severity INTEGER NOT NULL DEFAULT 0,
+    finding_count INTEGER NOT NULL DEFAULT 0,
+    partial INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    review TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_tenant ON reviews(tenant, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_repo ON reviews(repo, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_repo_file ON reviews(repo, file, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_created ON reviews(created_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_severity ON reviews(max_severity, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_code_hash ON reviews(code_hash);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    review_id INTEGER NOT NULL REFERENCES reviews(id),
+    category TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    line INTEGER,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_findings_review ON findings(review_id);
+
+-- Rolled up on every insert so trend queries never scan the reviews table
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT NOT NULL,
+    tenant TEXT NOT NULL DEFAULT '',
+    repo TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    language TEXT NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    latency_ms_total INTEGER NOT NULL DEFAULT 0,
+    tokens_total INTEGER NOT NULL DEFAULT 0,
+    findings_info INTEGER NOT NULL DEFAULT 0,
+    findings_low INTEGER NOT NULL DEFAULT 0,
+    findings_medium INTEGER NOT NULL DEFAULT 0,
+    findings_high INTEGER NOT NULL DEFAULT 0,
+    findings_critical INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, tenant, repo, provider, language)
+);
+"""
+
+REVIEW_COLUMNS = ("id", "created_at", "code_hash", "tenant", "repo", "file", "language", "provider", "tier",
+                  "latency_ms", "prompt_tokens", "completion_tokens", "max_severity",
+                  "finding_count", "partial", "error")
+
+GROUP_BY_COLUMNS = ("day", "tenant", "repo", "provider", "language")
+
+def code_hash(code):
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def parse_time(value):
+    """Epoch seconds or an ISO 8601 date/time -> epoch seconds"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+class ReviewStore:
+    """
+    Persistent SQLite history of review results
+
+    One connection per thread (WAL mode, so readers don't block the writer).
+    Every insert also updates the daily_stats rollup used by stats().
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('REVIEW_STORE_PATH', 'reviews.db')
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, code, result, latency_ms, repo='', file='', prompt_chars=0, tenant=''):
+        """
+        Store one review_code result and its parsed findings
+
+        Returns:
+            int: the review id
+        """
+        review = result.get('full_review') or ''
+        findings = result.get('findings') or parse_findings(review)
+        max_severity = max((severity_rank(f['severity']) for f in findings), default=0)
+
+        # Providers don't all report usage; Ollama does, otherwise ~4 chars per token
+        timings = result.get('timings') or {}
+        prompt_tokens = timings.get('prompt_tokens') or (prompt_chars or len(code)) // 4
+        completion_tokens = timings.get('eval_tokens') or len(review) // 4
+
+        created_at = time.time()
+        day = datetime.fromtimestamp(created_at, timezone.utc).strftime('%Y-%m-%d')
+        severity_counts = [0] * len(SEVERITY_LEVELS)
+        for finding in findings:
+            severity_counts[severity_rank(finding['severity'])] += 1
+
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO reviews (created_at, code_hash, tenant, repo, file, language, provider, tier, "
+                "latency_ms, prompt_tokens, completion_tokens, max_severity, finding_count, partial, "
+                "error, review) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (created_at, code_hash(code), tenant or '', repo or '', file or '', result.get('language'),
+                 result.get('provider'), result.get('tier'), int(latency_ms), prompt_tokens,
+                 completion_tokens, max_severity, len(findings), int(bool(result.get('partial'))),
+                 result.get('error'), review)
+            )
+            review_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO findings (review_id, category, severity, line, message) VALUES (?, ?, ?, ?, ?)",
+                [(review_id, f['category'], severity_rank(f['severity']), f.get('line'), f['message'])
+                 for f in findings]
+            )
+            conn.execute(
+                "INSERT INTO daily_stats (day, tenant, repo, provider, language, reviews, errors, latency_ms_total, "
+                "tokens_total, findings_info, findings_low, findings_medium, findings_high, findings_critical) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (day, tenant, repo, provider, language) DO UPDATE SET "
+                "reviews = reviews + 1, errors = errors + excluded.errors, "
+                "latency_ms_total = latency_ms_total + excluded.latency_ms_total, "
+                "tokens_total = tokens_total + excluded.tokens_total, "
+                "findings_info = findings_info + excluded.findings_info, "
+                "findings_low = findings_low + excluded.findings_low, "
+                "findings_medium = findings_medium + excluded.findings_medium, "
+                "findings_high = findings_high + excluded.findings_high, "
+                "findings_critical = findings_critical + excluded.findings_critical",
+                (day, tenant or '', repo or '', result.get('provider') or '', result.get('language') or '',
+                 int(bool(result.get('error'))), int(latency_ms), prompt_tokens + completion_tokens,
+                 *severity_counts)
+            )
+        return review_id
+
+    def query(self, repo=None, file=None, severity=None, since=None, until=None, cursor=None, limit=50,
+              tenant=None):
+        """
+        Newest-first page of reviews
+
+        Args:
+            tenant (str): only this tenant's reviews (None = all tenants)
+            severity (str): minimum severity of the review's worst finding
+            since/until (float): epoch seconds
+            cursor (int): next_cursor from the previous page
+
+        Returns:
+            dict: reviews and next_cursor (None on the last page)
+        """
+        clauses = []
+        params = []
+        if tenant is not None:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        if repo is not None:
+            clauses.append("repo = ?")
+            params.append(repo)
+        if file is not None:
+            clauses.append("file = ?")
+            params.append(file)
+        if severity is not None:
+            clauses.append("max_severity >= ?")
+            params.append(severity_rank(severity))
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+
+        limit = max(1, min(int(limit), 500))
+        sql = f"SELECT {', '.join(REVIEW_COLUMNS)} FROM reviews"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        rows = self._connection().execute(sql, params + [limit + 1]).fetchall()
+
+        reviews = [self._review_dict(row) for row in rows[:limit]]
+        return {
+            "reviews": reviews,
+            "next_cursor": reviews[-1]["id"] if len(rows) > limit else None
+        }
+
+    def get(self, review_id, tenant=None):
+        """One review with its full text and findings, or None (also if it belongs to another tenant)"""
+        conn = self._connection()
+        row = conn.execute(
+            f"SELECT {', '.join(REVIEW_COLUMNS)}, review FROM reviews WHERE id = ?", (review_id,)
+        ).fetchone()
+        if row is None or (tenant is not None and row["tenant"] != tenant):
+            return None
+        review = self._review_dict(row)
+        review["review"] = row["review"]
+        review["findings"] = [
+            {"category": f["category"], "severity": SEVERITY_LEVELS[f["severity"]],
+             "line": f["line"], "message": f["message"]}
+            for f in conn.execute(
+                "SELECT category, severity, line, message FROM findings WHERE review_id = ? ORDER BY id",
+                (review_id,)
+            )
+        ]
+        return review
+
+    def stats(self, group_by='day', repo=None, since=None, until=None, tenant=None):
+        """
+        Trend aggregates from the daily rollup
+
+        Args:
+            group_by (str): day, tenant, repo, provider or language
+            tenant (str): only this tenant's reviews (None = all tenants)
+            since/until (float): epoch seconds, rounded to whole days
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)}")
+
+        clauses = []
+        params = []
+        if tenant is not None:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        if repo is not None:
+            clauses.append("repo = ?")
+            params.append(repo)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(datetime.fromtimestamp(since, timezone.utc).strftime('%Y-%m-%d'))
+        if until is not None:
+            clauses.append("day <= ?")
+            params.append(datetime.fromtimestamp(until, timezone.utc).strftime('%Y-%m-%d'))
+
+        sql = (
+            f"SELECT {group_by} AS grp, SUM(reviews) AS reviews, SUM(errors) AS errors, "
+            "SUM(latency_ms_total) AS latency_ms_total, SUM(tokens_total) AS tokens_total, "
+            + ", ".join(f"SUM(findings_{level}) AS findings_{level}" for level in SEVERITY_LEVELS)
+            + " FROM daily_stats"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " GROUP BY grp ORDER BY grp"
+
+        results = []
+        for row in self._connection().execute(sql, params):
+            results.append({
+                group_by: row["grp"],
+                "reviews": row["reviews"],
+                "errors": row["errors"],
+                "avg_latency_ms": round(row["latency_ms_total"] / row["reviews"], 1) if row["reviews"] else 0,
+                "tokens_total": row["tokens_total"],
+                "findings": {level: row[f"findings_{level}"] for level in SEVERITY_LEVELS}
+            })
+        return results
+
+    @staticmethod
+    def _review_dict(row):
+        review = {column: row[column] for column in REVIEW_COLUMNS}
+        review["max_severity"] = SEVERITY_LEVELS[review["max_severity"]]
+        review["partial"] = bool(review["partial"])
+        return review
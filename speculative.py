@@ -0,0 +1,234 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from chunking import BOUNDARY_RE
+from triage import static_risk, has_security_risk
+
+
+def normalize(code):
+    """Drop trailing whitespace so cosmetic edits don't invalidate a speculation"""
+    return '\n'.join(line.rstrip() for line in code.strip().splitlines())
+
+
+def split_blocks(code, min_chars=200):
+    """
+    Split normalized code into top-level blocks (functions, classes, ...)
+
+    Cuts before each BOUNDARY_RE line, but only once the current block has
+    min_chars, so decorators and one-liners stay with their neighbours.
+    """
+    blocks = []
+    current = []
+    size = 0
+    for line in code.split('\n'):
+        if current and size >= min_chars and BOUNDARY_RE.match(line):
+            blocks.append('\n'.join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def block_key(block, language, scope=''):
+    return hashlib.sha256(f"{scope}\0{language}\0{block}".encode('utf-8')).hexdigest()
+
+
+class SpeculativeReviewer:
+    """
+    Runs the fast-tier triage on drafts while the user is still typing
+
+    The web UI posts debounced drafts. Each draft is split into top-level
+    blocks and every block is triaged in the background, cached by its
+    normalized text, so editing one function leaves the speculation for
+    the rest of the file intact. A newer draft cancels the blocks of the
+    older one that haven't started and are no longer part of it.
+
+    On submit, review_code combines the cached (or still running) block
+    triages and only triages the blocks that changed since the last draft.
+    A block whose triage hasn't started yet (still queued for a worker or
+    a scheduler slot) is claimed and triaged inline instead, since the
+    submitting request may hold the very slot it is waiting for.
+    Cache entries are scoped per tenant.
+    """
+
+    def __init__(self, reviewer):
+        self.reviewer = reviewer
+        self.max_chars = int(os.getenv('SPECULATIVE_MAX_CHARS', str(reviewer.max_chunk_chars)))
+        self.min_block_chars = int(os.getenv('SPECULATIVE_MIN_BLOCK_CHARS', '200'))
+        self.ttl = float(os.getenv('SPECULATIVE_TTL_SECONDS', '600'))
+        self.max_entries = int(os.getenv('SPECULATIVE_CACHE_SIZE', '1024'))
+        # Longest a submit waits on a block triage that is already running
+        self.max_wait = float(os.getenv('SPECULATIVE_WAIT_SECONDS', '10'))
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv('SPECULATIVE_WORKERS', '2')))
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # block key -> (created_at, future, claim lock)
+        self._sessions = OrderedDict()  # (scope, session id) -> block keys of its latest draft
+        self.stats = {"drafts": 0, "started": 0, "superseded": 0, "hits": 0, "partial_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _run(self, block, language, admit, claim):
+        if admit is None:
+            return self._triage(block, language, claim)
+        with admit(len(block)):
+            return self._triage(block, language, claim)
+
+    def _triage(self, block, language, claim):
+        """Background triage, unless a submit already claimed the block; None if it did"""
+        if not claim.acquire(blocking=False):
+            return None
+        return self.reviewer.triage_code(block, language)
+
+    def _evict(self, now):
+        while self._cache:
+            key, (created_at, future, _) = next(iter(self._cache.items()))
+            if len(self._cache) <= self.max_entries and now - created_at < self.ttl:
+                break
+            future.cancel()
+            del self._cache[key]
+
+    def _blocks(self, code, language, scope):
+        blocks = split_blocks(normalize(code), self.min_block_chars)
+        return [(block_key(block, language, scope), block) for block in blocks]
+
+    def submit_draft(self, session_id, code, language, scope='', admit=None):
+        """
+        Start speculative triages for the blocks of the session's latest draft
+
+        Args:
+            scope (str): cache namespace, the tenant name
+            admit (callable): size -> context manager wrapped around each
+                              background triage (scheduler slot and quota)
+
+        Returns:
+            str: "started" if any block was started, "running", "ready" or "ignored"
+        """
+        if not code or code.isspace() or len(code) > self.max_chars:
+            return "ignored"
+
+        if not language:
+            # Same detection review_code applies, so the keys match on submit
+            language = self.reviewer.detect_language(code)
+        blocks = self._blocks(code, language, scope)
+        keys = {key for key, _ in blocks}
+        session = (scope, session_id)
+        now = time.time()
+        started = 0
+        with self._lock:
+            self.stats["drafts"] += 1
+            for key in self._sessions.get(session, ()):
+                # Only cancels if it hasn't started; a running triage is kept for the cache
+                if key not in keys and key in self._cache and self._cache[key][1].cancel():
+                    del self._cache[key]
+                    self.stats["superseded"] += 1
+            self._sessions[session] = keys
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+            for key, block in blocks:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self._cache.move_to_end(key)
+                    continue
+                claim = threading.Lock()
+                self._cache[key] = (now, self._executor.submit(self._run, block, language, admit, claim), claim)
+                started += 1
+            self.stats["started"] += started
+            self._evict(now)
+            ready = all(key in self._cache and self._cache[key][1].done() for key in keys)
+
+        if started:
+            return "started"
+        return "ready" if ready else "running"
+
+    def _cached(self, key, deadline):
+        """
+        Finished triage for a block, waiting on a running one; None if unavailable
+
+        A triage that hasn't started is claimed (and cancelled if still
+        queued) and dropped from the cache, so the caller triages the
+        block inline instead.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and not entry[1].done() and entry[2].acquire(blocking=False):
+                entry[1].cancel()
+                del self._cache[key]
+                return None
+        if entry is None or entry[1].cancelled() or time.time() - entry[0] >= self.ttl:
+            return None
+        future = entry[1]
+        timeout = self.max_wait
+        if deadline and deadline.remaining() is not None:
+            timeout = min(timeout, deadline.remaining())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Speculative triage failed: {e}")
+            return None
+
+    def _store(self, key, triage):
+        """Cache a triage done inline, so the next draft or submit can reuse it"""
+        future = Future()
+        future.set_result(triage)
+        claim = threading.Lock()
+        claim.acquire()
+        with self._lock:
+            self._cache[key] = (time.time(), future, claim)
+            self._cache.move_to_end(key)
+            self._evict(time.time())
+
+    def lookup(self, code, language, deadline=None, scope=''):
+        """
+        Triage for submitted code, built from the speculated blocks
+
+        Blocks with a speculation are taken from the cache (waiting on
+        running ones up to SPECULATIVE_WAIT_SECONDS or the deadline); the
+        rest, including those whose triage hadn't started, are triaged now.
+        Returns None if no block was speculated.
+        """
+        blocks = self._blocks(code, language, scope)
+        cached = [self._cached(key, deadline) for key, _ in blocks]
+        if not any(cached):
+            self._count("misses")
+            return None
+        self._count("hits" if all(cached) else "partial_hits")
+
+        triages = []
+        for triage, (key, block) in zip(cached, blocks):
+            if triage is None:
+                triage = self.reviewer.triage_code(block, language, deadline)
+                self._store(key, triage)
+            triages.append(triage)
+        return self._combine(code, triages)
+
+    @staticmethod
+    def _combine(code, triages):
+        """One triage for the whole submission from its blocks' triages"""
+        # Whole-file patterns (e.g. snippet size) aren't visible per block
+        static_score, static_notes = static_risk(code)
+        notes = []
+        for line in [f"- {note}" for note in static_notes] + \
+                [line for triage in triages for line in (triage["notes"] or '').splitlines()]:
+            if line.strip() and line not in notes:
+                notes.append(line)
+        reviews = [triage["review"] for triage in triages if triage["review"]]
+        return {
+            "risk_score": max([static_score] + [triage["risk_score"] for triage in triages]),
+            "security": has_security_risk(static_notes) or any(triage.get("security") for triage in triages),
+            "notes": "\n".join(notes),
+            "provider": triages[0]["provider"],
+            "review": "\n\n".join(reviews) or None,
+            "speculative": True
+        }
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Scheduling weight of each priority class: while all classes have work
+# queued, interactive requests get 8 slots for every 2 CI and 1 nightly.
+PRIORITY_WEIGHTS = {
+    'interactive': 8,
+    'ci': 2,
+    'nightly': 1
+}
+
+
+class TenantError(Exception):
+    """Request rejected by tenant policy; status is the HTTP status to return"""
+
+    def __init__(self, message, status=429):
+        super().__init__(message)
+        self.status = status
+
+
+class Tenant:
+    """An API key with its priority class, limits and usage counters"""
+
+    def __init__(self, name, priority='interactive', max_concurrency=4, max_queued=50,
+                 token_quota=None):
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"❌ Unknown priority '{priority}' for tenant {name}")
+        self.name = name
+        self.priority = priority
+        self.weight = PRIORITY_WEIGHTS[priority]
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.token_quota = token_quota
+
+        self.in_flight = 0
+        self.queued = 0
+        self.reserved_tokens = 0  # estimates of queued requests, counted against the quota
+        self.requests = 0
+        self.rejected = 0
+        self.tokens_total = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._window = deque()  # (timestamp, tokens) inside the quota window
+
+    def record_tokens(self, tokens):
+        self._window.append((time.time(), tokens))
+        self.tokens_total += tokens
+
+    def tokens_in_window(self, window_seconds, now):
+        while self._window and self._window[0][0] < now - window_seconds:
+            self._window.popleft()
+        return sum(tokens for _, tokens in self._window)
+
+    def usage(self, window_seconds):
+        return {
+            "tenant": self.name,
+            "priority": self.priority,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "tokens_total": self.tokens_total,
+            "tokens_in_window": self.tokens_in_window(window_seconds, time.time()),
+            "tokens_reserved": self.reserved_tokens,
+            "token_quota": self.token_quota,
+            "max_concurrency": self.max_concurrency,
+            "avg_wait_ms": round(self.wait_seconds * 1000 / self.requests, 1) if self.requests else 0.0,
+            "avg_busy_ms": round(self.busy_seconds * 1000 / self.requests, 1) if self.requests else 0.0
+        }
+
+
+class TenantRegistry:
+    """
+    Maps API keys to tenants
+
+    Tenants come from TENANTS_FILE (a JSON file) or TENANTS (inline JSON):
+        {"<api key>": {"name": "ci-bot", "priority": "ci", "max_concurrency": 2,
+                       "max_queued": 200, "token_quota": 500000}}
+
+    Requests without a known key use the anonymous tenant (the web UI)
+    unless REQUIRE_API_KEY=true. Tenants without a name get an id derived
+    from a hash of the key, so the key itself never shows up in usage
+    reports or logs.
+    """
+
+    def __init__(self):
+        self.require_key = os.getenv('REQUIRE_API_KEY', 'false').lower() == 'true'
+        self.anonymous = Tenant(
+            'anonymous',
+            priority=os.getenv('ANONYMOUS_PRIORITY', 'interactive'),
+            max_concurrency=int(os.getenv('ANONYMOUS_MAX_CONCURRENCY', '4'))
+        )
+        self.tenants = {}
+        self.internal = []  # tenants without an API key, e.g. webhooks
+
+        config = self._load_config()
+        for api_key, settings in config.items():
+            self.tenants[api_key] = Tenant(
+                settings.get('name') or self._tenant_id(api_key),
+                priority=settings.get('priority', 'interactive'),
+                max_concurrency=int(settings.get('max_concurrency', 4)),
+                max_queued=int(settings.get('max_queued', 50)),
+                token_quota=settings.get('token_quota')
+            )
+
+    @staticmethod
+    def _tenant_id(api_key):
+        return 'tenant-' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+
+    @staticmethod
+    def _load_config():
+        path = os.getenv('TENANTS_FILE')
+        if path:
+            with open(path) as f:
+                return json.load(f)
+        inline = os.getenv('TENANTS')
+        if inline:
+            return json.loads(inline)
+        return {}
+
+    def resolve(self, api_key):
+        tenant = self.tenants.get(api_key) if api_key else None
+        if tenant is None:
+            if self.require_key:
+                raise TenantError("Missing or invalid API key", status=401)
+            return self.anonymous
+        return tenant
+
+    def register(self, tenant):
+        """Add a tenant that isn't reachable by API key, so it shows up in usage reports"""
+        self.internal.append(tenant)
+        return tenant
+
+    def all(self):
+        return [self.anonymous] + list(self.tenants.values()) + self.internal
+
+
+class FairScheduler:
+    """
+    Weighted-fair admission in front of the AI provider
+
+    At most `slots` reviews run at once. Waiting requests get a virtual
+    finish tag (start + cost / weight, per tenant), and a free slot goes to
+    the smallest tag whose tenant is under its own concurrency limit.
+    A busy CI tenant therefore queues behind itself, not in front of
+    interactive users.
+    """
+
+    def __init__(self, slots=None, window_seconds=None):
+        self.slots = slots if slots is not None else int(os.getenv('SCHEDULER_SLOTS', '4'))
+        self.window_seconds = window_seconds if window_seconds is not None else \
+            int(os.getenv('QUOTA_WINDOW_SECONDS', '3600'))
+        self._cond = threading.Condition()
+        self._free = self.slots
+        self._waiting = []
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._seq = 0
+
+    def _next(self):
+        """Waiting entry that should get the next free slot"""
+        eligible = [entry for entry in self._waiting
+                    if entry[2].in_flight < entry[2].max_concurrency]
+        return min(eligible, key=lambda entry: (entry[0], entry[1])) if eligible else None
+
+    def _admit(self, tenant, tokens, timeout):
+        with self._cond:
+            now = time.time()
+            # Queued requests hold a reservation, so a burst can't all pass the check at once
+            if tenant.token_quota is not None and tenant.tokens_in_window(self.window_seconds, now) + \
+                    tenant.reserved_tokens + tokens > tenant.token_quota:
+                tenant.rejected += 1
+                raise TenantError(f"Token quota exceeded for tenant {tenant.name}")
+            if tenant.queued >= tenant.max_queued:
+                tenant.rejected += 1
+                raise TenantError(f"Too many queued requests for tenant {tenant.name}")
+
+            start = max(self._virtual_time, self._last_finish.get(tenant.name, 0.0))
+            entry = (start + tokens / tenant.weight, self._seq, tenant)
+            self._seq += 1
+            self._last_finish[tenant.name] = entry[0]
+            self._waiting.append(entry)
+            tenant.queued += 1
+            tenant.reserved_tokens += tokens
+
+            deadline = now + timeout
+            try:
+                while not (self._free > 0 and self._next() is entry):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        tenant.rejected += 1
+                        raise TenantError(f"Timed out waiting for a review slot ({tenant.name})", status=503)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(entry)
+                tenant.queued -= 1
+                tenant.reserved_tokens -= tokens
+                self._cond.notify_all()
+
+            self._free -= 1
+            self._virtual_time = max(self._virtual_time, entry[0])
+            tenant.in_flight += 1
+            tenant.requests += 1
+            tenant.wait_seconds += time.time() - now
+            tenant.record_tokens(tokens)
+
+    def _release(self, tenant, busy_seconds):
+        with self._cond:
+            self._free += 1
+            tenant.in_flight -= 1
+            tenant.busy_seconds += busy_seconds
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tenant, tokens, timeout=None):
+        """
+        Wait for a review slot for this tenant
+
+        Args:
+            tenant (Tenant): resolved tenant
+            tokens (int): estimated tokens, charged against the quota
+            timeout (float): max seconds to queue (default SCHEDULER_TIMEOUT)
+
+        Raises:
+            TenantError: quota exceeded, queue full or timed out
+        """
+        if timeout is None:
+            timeout = float(os.getenv('SCHEDULER_TIMEOUT', '120'))
+        self._admit(tenant, tokens, timeout)
+        start_time = time.time()
+        try:
+            yield tenant
+        finally:
+            self._release(tenant, time.time() - start_time)
+
+    def adjust(self, tenant, tokens):
+        """Correct the admission estimate once actual usage is known (may be negative)"""
+        with self._cond:
+            tenant.record_tokens(tokens)
+
+    def usage(self, registry):
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "free_slots": self._free,
+                "queued": len(self._waiting),
+                "tenants": [tenant.usage(self.window_seconds) for tenant in registry.all()]
+            }
+
+
+def estimate_tokens(text_length, max_tokens=1000):
+    """Rough token estimate (~4 characters per token) plus the response budget"""
+    return text_length // 4 + max_tokens
@@ -0,0 +1,124 @@
+import re
+
+# Patterns that make a snippet worth sending to the premium model.
+# Each entry: (regex, weight, note)
+RISK_PATTERNS = [
+    (r'\b(eval|exec)\s*\(', 4, "dynamic code execution (eval/exec)"),
+    (r'\b(os\.system|subprocess\.|popen\s*\(|child_process)', 4, "shell / process execution"),
+    (r'\bpickle\.loads?\b|\byaml\.load\s*\((?![^)]*Loader)', 4, "unsafe deserialization"),
+    (r'(select|insert|update|delete)\s.+(%s|\+\s*\w+|\{\w*\}|f["\'])', 4, "SQL built from strings"),
+    (r'(password|secret|api_key|token)\s*=\s*["\'][^"\']+["\']', 4, "hardcoded credential"),
+    (r'\binnerHTML\b|\bdocument\.write\b|dangerouslySetInnerHTML', 4, "HTML injection sink"),
+    (r'\bverify\s*=\s*False\b', 2, "TLS verification disabled"),
+    (r'\b(md5|sha1)\s*\(', 2, "weak hash"),
+    (r'\bexcept\s*:|\bcatch\s*\(\s*\w*\s*\)\s*\{\s*\}', 1, "swallowed exceptions"),
+    (r'\b(threading|multiprocessing|async\s+def|await|Lock\s*\()', 1, "concurrency"),
+    (r'\bopen\s*\(|\bfs\.\w+', 1, "file system access"),
+]
+
+# Any one of these escalates on its own, whatever TRIAGE_THRESHOLD is set to
+SECURITY_NOTES = {
+    "dynamic code execution (eval/exec)",
+    "shell / process execution",
+    "unsafe deserialization",
+    "SQL built from strings",
+    "hardcoded credential",
+    "HTML injection sink",
+}
+
+SYSTEM_MESSAGE = (
+    "You are a fast code triage assistant. Estimate how risky a code snippet is "
+    "(bugs, security, performance) and whether it needs an in-depth expert review."
+)
+
+
+def static_risk(code):
+    """
+    Cheap pre-pass that scores a snippet without calling any model
+
+    Returns:
+        tuple: (risk score 0-10, list of notes)
+    """
+    notes = []
+    score = 0
+
+    for pattern, weight, note in RISK_PATTERNS:
+        if re.search(pattern, code, re.IGNORECASE):
+            score += weight
+            notes.append(note)
+
+    lines = [line for line in code.splitlines() if line.strip()]
+    if len(lines) > 150:
+        score += 3
+        notes.append(f"large snippet ({len(lines)} lines)")
+    elif len(lines) > 40:
+        score += 1
+        notes.append(f"medium snippet ({len(lines)} lines)")
+
+    loops = len(re.findall(r'^\s*(for|while)\b', code, re.MULTILINE))
+    if loops >= 2:
+        score += 1
+        notes.append(f"{loops} loops (possible nested iteration)")
+
+    return min(score, 10), notes
+
+
+def has_security_risk(notes):
+    """True if the static pre-pass flagged a security-class pattern"""
+    return any(note in SECURITY_NOTES for note in notes)
+
+
+def should_escalate(triage, threshold):
+    """A triage goes to the premium model if it scores high or hit a security pattern"""
+    return triage["risk_score"] >= threshold or triage.get("security", False)
+
+
+def create_triage_prompt(code, language, static_notes):
+    """Prompt for the fast tier: a risk score first, then a short review"""
+    prompt = f"Triage this {language} code:\n```{language}\n{code}\n```\n"
+    if static_notes:
+        prompt += "Static pre-pass flagged: " + "; ".join(static_notes) + "\n"
+    prompt += (
+        "First line must be exactly `RISK: <0-10>` (0 = trivial, 10 = critical).\n"
+        "Then give a short review (at most 5 bullet points) of anything notable."
+    )
+    return prompt
+
+
+def parse_risk(response):
+    """
+    Split a triage response into (risk score, notes)
+
+    Returns None as the score if the model didn't follow the format,
+    so the caller can escalate to be safe.
+    """
+    match = re.search(r'RISK\s*:\s*(\d+(?:\.\d+)?)', response, re.IGNORECASE)
+    if not match:
+        return None, response.strip()
+    score = min(max(float(match.group(1)), 0.0), 10.0)
+    notes = (response[:match.start()] + response[match.end():]).strip()
+    return score, notes
+
+
+if __name__ == "__main__":
+    # Quick check that single security patterns escalate on their own
+    import os
+    threshold = float(os.getenv('TRIAGE_THRESHOLD', '4'))
+    snippets = [
+        "os.system('rm -rf ' + path)",
+        "subprocess.call(cmd, shell=True)",
+        "data = pickle.loads(data)",
+        "password = 'hunter2'",
+        "el.innerHTML = userInput",
+        "cursor.execute(f\"SELECT * FROM users WHERE name = '{name}'\")",
+        "result = eval(expression)",
+    ]
+    failed = 0
+    for snippet in snippets:
+        score, notes = static_risk(snippet)
+        escalated = should_escalate({"risk_score": score, "security": has_security_risk(notes)}, threshold)
+        print(f"{'✅' if escalated else '❌'} risk {score:>2} {snippet}")
+        failed += not escalated
+    if failed:
+        raise SystemExit(f"❌ {failed} security snippet(s) would stay on the fast tier")
+    print("🎉 All security snippets escalate")